@@ -0,0 +1,94 @@
+import argparse
+import sys
+import time
+from datetime import date
+
+# Command line entry point for batch jobs and cron refreshes. Only the fetch and store modules are
+# imported up front, neither pandas nor Streamlit, so a run starts in a fraction of a second.
+# pandas comes in once a stored season gets its teammate head-to-heads derived:
+#
+#   python -m api ingest --seasons 2000-2025
+#   python -m api ingest                          (refreshes the running season)
+#   python -m api bulk --seasons 1950-2025        (parquet partitions, one process per core)
+
+def parse_seasons(value):
+    if "-" in value:
+        first, last = value.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(season) for season in value.split(",")]
+
+def materialize(year):
+    from api.results_api import load_results_data
+    from api.qualifying_api import load_qualifying_data
+    from api.teammates_api import materialize_teammates
+
+    materialize_teammates(year, load_results_data(year), load_qualifying_data(year))
+
+def ingest(args):
+    import asyncio
+    from api.client import get_stats, FetchError
+    from api.season_loader import fetch_season
+
+    start_time = time.perf_counter()
+    failed_seasons = []
+
+    # Newest first, the seasons people look at most are stored first
+    for year in sorted(parse_seasons(args.seasons), reverse=True):
+        season_start = time.perf_counter()
+        failed = asyncio.run(fetch_season(year, args.endpoints))
+
+        if failed:
+            failed_seasons.append(year)
+            print(f"{year}: failed {', '.join(failed)} ({time.perf_counter() - season_start:.2f} seconds)")
+            continue
+
+        # The head-to-heads are derived from the stored results and qualifying, the app reads them back
+        if {"results", "qualifying"} <= set(args.endpoints):
+            try:
+                materialize(year)
+            except FetchError as error:
+                failed_seasons.append(year)
+                print(f"{year}: failed teammates, {error} ({time.perf_counter() - season_start:.2f} seconds)")
+                continue
+
+        print(f"{year}: stored ({time.perf_counter() - season_start:.2f} seconds)")
+
+    print(f"Ingested in {time.perf_counter() - start_time:.2f} seconds, client: {get_stats()}")
+
+    # Non zero exit code so cron and CI notice, the failed endpoints are retried on the next run
+    return 1 if failed_seasons else 0
+
+def bulk(args):
+    from api.bulk import ingest_seasons
+
+    start_time = time.perf_counter()
+
+    failed = ingest_seasons(parse_seasons(args.seasons), args.out, args.workers, args.force)
+
+    print(f"Bulk ingest finished in {time.perf_counter() - start_time:.2f} seconds{', failed: ' + ', '.join(map(str, failed)) if failed else ''}")
+
+    return 1 if failed else 0
+
+def main(argv=None):
+    from api.season_loader import ENDPOINTS
+
+    parser = argparse.ArgumentParser(prog="python -m api", description="F1 season data without the app")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="fetch seasons into the local season store")
+    ingest_parser.add_argument("--seasons", default=str(date.today().year), help="e.g. 2023, 2019,2021 or 2000-2025, defaults to the running season")
+    ingest_parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    ingest_parser.set_defaults(run=ingest)
+
+    bulk_parser = commands.add_parser("bulk", help="build parquet partitions of many seasons with a process pool")
+    bulk_parser.add_argument("--seasons", default=f"1950-{date.today().year}")
+    bulk_parser.add_argument("--out", default=None, help="partitions directory, defaults to F1_PARTITIONS_PATH or data/partitions")
+    bulk_parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the number of cores")
+    bulk_parser.add_argument("--force", action="store_true", help="rebuild seasons that are already done")
+    bulk_parser.set_defaults(run=bulk)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from multiprocessing import get_context
+
+# Bulk ingestion of many seasons: seasons fan out over a process pool, every worker fetches
+# (through the season store), parses and derives its season and writes one parquet file per
+# dataset. A season counts as done once its marker file exists, so an interrupted run resumes
+# where it stopped. Finished seasons are skipped on later runs, the running one is redone.
+#
+#   <out>/drivers/<year>.parquet, <out>/standings/<year>.parquet,
+#   <out>/results/<year>.parquet, <out>/qualifying/<year>.parquet, <out>/teammates/<year>.parquet,
+#   <out>/_done/<year>
+
+PARTITIONS_DIR = os.environ.get("F1_PARTITIONS_PATH", os.path.join("data", "partitions"))
+
+DATASETS = ("drivers", "standings", "results", "qualifying", "teammates")
+
+def marker_path(out_dir, year):
+    return os.path.join(out_dir, "_done", str(year))
+
+def is_done(out_dir, year):
+    return year < date.today().year and os.path.exists(marker_path(out_dir, year))
+
+def write_partition(frame, out_dir, dataset, year):
+    import pandas as pd
+    from api import ids
+
+    directory = os.path.join(out_dir, dataset)
+    os.makedirs(directory, exist_ok=True)
+
+    # The id columns go out as Ergast ids (see ids.keys_for)
+    keys = {"driver_id": ids.drivers, "teammate_id": ids.drivers, "constructor_id": ids.constructors}
+    frame = frame.assign(**{
+        column: pd.Categorical(interner.keys_for(frame[column]))
+        for column, interner in keys.items() if column in frame
+    })
+
+    # Every partition carries its season, so the files of a dataset can be read as one frame
+    if "season" not in frame:
+        frame = frame.assign(season=year).astype({"season": "int16"})
+
+    # Written aside and renamed, a killed worker never leaves a truncated partition behind
+    path = os.path.join(directory, f"{year}.parquet")
+    frame.to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+
+def init_worker(workers):
+    from api.client import share_rate_budget
+
+    share_rate_budget(1 / workers)
+
+def ingest_season(year, out_dir):
+    # Runs in a worker process, the heavy imports happen once per worker
+    from api.drivers_api import load_drivers_data
+    from api.standings_api import load_standings_data
+    from api.results_api import load_results_data
+    from api.qualifying_api import load_qualifying_data
+    from api.teammates_api import materialize_teammates
+
+    start_time = time.perf_counter()
+
+    frames = {
+        "drivers": load_drivers_data(year),
+        "standings": load_standings_data(year),
+        "results": load_results_data(year),
+        "qualifying": load_qualifying_data(year)
+    }
+
+    # Teammate head-to-heads are derived here once and stored next to the season
+    frames["teammates"] = materialize_teammates(year, frames["results"], frames["qualifying"])
+
+    for dataset, frame in frames.items():
+        write_partition(frame, out_dir, dataset, year)
+
+    os.makedirs(os.path.dirname(marker_path(out_dir, year)), exist_ok=True)
+    with open(marker_path(out_dir, year), "w") as marker:
+        marker.write(f"{time.time()}\n")
+
+    return {dataset: len(frame) for dataset, frame in frames.items()}, time.perf_counter() - start_time
+
+def ingest_seasons(seasons, out_dir=None, workers=None, force=False):
+    # Returns the seasons that failed, they are picked up again by the next run
+    out_dir = out_dir or PARTITIONS_DIR
+    workers = workers or os.cpu_count() or 1
+
+    pending = [year for year in sorted(seasons, reverse=True) if force or not is_done(out_dir, year)]
+    skipped = len(seasons) - len(pending)
+
+    if skipped:
+        print(f"Skipping {skipped} seasons already ingested")
+
+    failed = []
+
+    if not pending:
+        return failed
+
+    workers = min(workers, len(pending))
+
+    # spawn gives every worker fresh imports, no sqlite connection or lock is inherited from the parent
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=init_worker,
+        initargs=(workers,)
+    ) as executor:
+        futures = {executor.submit(ingest_season, year, out_dir): year for year in pending}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            year = futures[future]
+
+            try:
+                rows, seconds = future.result()
+            except Exception as error:
+                failed.append(year)
+                print(f"{year}: failed, {error} ({done}/{len(pending)})")
+            else:
+                print(f"{year}: {', '.join(f'{count} {dataset}' for dataset, count in rows.items())} in {seconds:.2f} seconds ({done}/{len(pending)})")
+
+    return failed
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from api.client import background, FetchError
+from functions.metrics import timer, register_cache
+
+# In-process cache for the season frames built by the get_*_data functions. One instance is
+# shared by every Streamlit session in the process, so it is locked, bounded, and concurrent
+# callers asking for the same cold season wait on a single load instead of all fetching it.
+#
+# Stale entries are served at once while a background load refreshes them, and a failed load
+# is remembered for FAILURE_TTL seconds so callers fail fast instead of queueing on the API.
+
+# Seasons kept per api module, least recently used ones are dropped first
+MAX_ENTRIES = int(os.environ.get("F1_CACHE_SEASONS", 8))
+
+# Seconds a failed load is served as a failure before the next attempt
+FAILURE_TTL = float(os.environ.get("F1_FAILURE_TTL", 30))
+
+class SeasonCache:
+    def __init__(self, is_fresh, name, max_entries=MAX_ENTRIES):
+        # is_fresh(key, stored_at) decides whether a cached value can be served without a refresh,
+        # name is what the cache and its get stage are reported as in the metrics
+        self.is_fresh = is_fresh
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._failures = {}
+        self._refreshing = set()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "failures": 0, "failure_hits": 0, "evictions": 0}
+
+        register_cache(name, self)
+
+    def _recent_failure(self, key):
+        # Caller holds self._lock. Only the message is kept, every caller gets an exception of its
+        # own so a shared one does not collect their frames in its traceback
+        failure = self._failures.get(key)
+
+        if failure is None or time.time() - failure[1] > FAILURE_TTL:
+            return None
+
+        return failure[0]
+
+    def _store(self, key, value):
+        # Caller holds self._lock
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+        self._failures.pop(key, None)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _revalidate(self, key, load):
+        # Caller holds self._lock, at most one refresh per key and none while backing off
+        if key in self._refreshing or self._recent_failure(key) is not None:
+            return
+
+        self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, load), daemon=True).start()
+
+    def _refresh(self, key, load):
+        try:
+            with background():
+                value = load(key)
+        except FetchError as error:
+            with self._lock:
+                self._failures[key] = (str(error), time.time())
+                self.stats["failures"] += 1
+        else:
+            with self._lock:
+                self._store(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, load):
+        # What the get_*_data functions of the api modules serve: the value from memory, concurrent
+        # callers for a cold key share one load. Raises FetchError when the key cannot be loaded,
+        # the failure is only kept for FAILURE_TTL seconds
+        with timer("get", self.name):
+            return self._get(key, load)
+
+    def _get(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+                if self.is_fresh(key, entry[1]):
+                    self.stats["hits"] += 1
+                else:
+                    # Stale while revalidate: the last good copy now, the refreshed one on a later call
+                    self.stats["stale_hits"] += 1
+                    self._revalidate(key, load)
+
+                return entry[0]
+
+            failure = self._recent_failure(key)
+            if failure is not None:
+                self.stats["failure_hits"] += 1
+                raise FetchError(failure)
+
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Single flight: only one caller per key runs load, the rest wait here and reuse its result
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.stats["coalesced"] += 1
+                    return entry[0]
+
+                failure = self._recent_failure(key)
+                if failure is not None:
+                    self.stats["coalesced"] += 1
+                    raise FetchError(failure)
+
+                self.stats["misses"] += 1
+
+            try:
+                value = load(key)
+            except FetchError as error:
+                with self._lock:
+                    self._failures[key] = (str(error), time.time())
+                    self.stats["failures"] += 1
+                raise
+            else:
+                with self._lock:
+                    self._store(key, value)
+            finally:
+                # Later callers find the entry, the failure, or run the load again
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+        return value
+
+    def peek(self, key):
+        # Last value stored for key even when it is no longer fresh, so a load can update it in place
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._failures.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
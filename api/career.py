@@ -0,0 +1,190 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from functions.metrics import timer, count
+from api.bulk import PARTITIONS_DIR, is_done
+from api.cache import SeasonCache
+from api.store import is_fresh, is_finished
+from api.pagination import MAX_WORKERS
+from api.client import FetchError
+from api.results_api import get_results_data
+from api.qualifying_api import get_qualifying_data
+from api.standings_api import get_standings_data
+from api import ids
+
+# Careers over a range of seasons. Every season is read from its bulk parquet partition
+# (python -m api bulk) when one has been written, only the columns the career tables use. Seasons
+# without a finished partition come from the season caches, through the store. The season frames
+# of all datasets are concatenated once per comparison and every aggregate is a group-by over the
+# driver_id codes of the selected drivers.
+
+# dataset: (columns read from the partition, loader of the season frame)
+DATASETS = {
+    "results": (
+        ["season", "round", "race_name", "driver_id", "given_name", "family_name", "constructor_name",
+         "position", "points", "sprint_points", "fastest_lap_rank", "win", "podium", "top10_finish"],
+        get_results_data
+    ),
+    "qualifying": (["season", "round", "driver_id", "given_name", "family_name", "position"], get_qualifying_data),
+    "standings": (["season", "driver_id", "given_name", "family_name", "position", "points", "wins"], get_standings_data)
+}
+
+cache = SeasonCache(lambda key, stored_at: is_fresh(key[1], stored_at), "career_seasons", max_entries=len(DATASETS) * 32)
+
+def partition_path(out_dir, dataset, year):
+    return os.path.join(out_dir, dataset, f"{year}.parquet")
+
+def intern_partition(frame):
+    # Partitions hold Ergast ids, interned once per distinct driver rather than per row
+    keys = frame["driver_id"].astype("category")
+    first_rows = frame.drop_duplicates("driver_id").set_index("driver_id")
+
+    codes = np.asarray([
+        ids.drivers.code(key, {
+            "driverId": key,
+            "givenName": first_rows.at[key, "given_name"],
+            "familyName": first_rows.at[key, "family_name"]
+        })
+        for key in keys.cat.categories
+    ], dtype=np.int32)
+
+    return frame.assign(driver_id=codes[keys.cat.codes])
+
+def load_career_season(key, out_dir=None):
+    dataset, year = key
+    columns, get_data = DATASETS[dataset]
+    out_dir = out_dir or PARTITIONS_DIR
+
+    path = partition_path(out_dir, dataset, year)
+
+    if is_done(out_dir, year) and os.path.exists(path):
+        count("career_partition_reads")
+        return intern_partition(pd.read_parquet(path, columns=columns))
+
+    # The running season and seasons never bulk ingested, may raise FetchError
+    count("career_season_loads")
+    frame = get_data(year)
+
+    if "season" not in frame:
+        frame = frame.assign(season=year).astype({"season": "int16"})
+
+    return frame[columns]
+
+def get_career_season(dataset, year):
+    return cache.get((dataset, int(year)), load_career_season)
+
+def load_career_frames(seasons, drivers):
+    # {dataset: rows of the drivers over the seasons} and the seasons that could not be loaded
+    def load(year):
+        try:
+            frames = {dataset: get_career_season(dataset, year) for dataset in DATASETS}
+        except FetchError:
+            return year, None
+
+        return year, {dataset: frame[frame["driver_id"].isin(drivers)] for dataset, frame in frames.items()}
+
+    parts = {dataset: [] for dataset in DATASETS}
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(seasons)))) as executor:
+        for year, frames in executor.map(load, seasons):
+            if frames is None:
+                failed.append(year)
+                continue
+
+            for dataset, frame in frames.items():
+                parts[dataset].append(frame)
+
+    # Season frames disagree on categories, the concatenated columns are plain values
+    frames = {
+        dataset: pd.concat(parts[dataset], ignore_index=True) if parts[dataset] else pd.DataFrame(columns=DATASETS[dataset][0])
+        for dataset in DATASETS
+    }
+
+    return frames, failed
+
+def career_curves(results):
+    # One row per driver and race in career order, running totals over the whole range
+    results = results.sort_values(["driver_id", "season", "round"], kind="stable", ignore_index=True)
+    by_driver = results.groupby("driver_id", sort=False)
+
+    race_points = results["points"].astype("float64") + results["sprint_points"].astype("float64").fillna(0)
+
+    return pd.DataFrame({
+        "driver_id": results["driver_id"],
+        "driver": ids.drivers.names_for(results["driver_id"]),
+        "constructor_name": results["constructor_name"].astype(str),
+        "season": results["season"],
+        "round": results["round"],
+        "race_name": results["race_name"].astype(str),
+        "career_race": by_driver.cumcount() + 1,
+        "total_points": race_points.groupby(results["driver_id"]).cumsum(),
+        "total_wins": by_driver["win"].cumsum(),
+        "total_podiums": by_driver["podium"].cumsum()
+    })
+
+def career_seasons(standings):
+    # Championship position and points of every season in the range
+    standings = standings.sort_values(["driver_id", "season"], kind="stable", ignore_index=True)
+
+    return pd.DataFrame({
+        "driver_id": standings["driver_id"],
+        "driver": ids.drivers.names_for(standings["driver_id"]),
+        "season": standings["season"],
+        "position": standings["position"],
+        "points": standings["points"],
+        "wins": standings["wins"]
+    })
+
+def career_table(frames):
+    results, qualifying, standings = frames["results"], frames["qualifying"], frames["standings"]
+
+    race_points = results["points"].astype("float64") + results["sprint_points"].astype("float64").fillna(0)
+
+    table = results.assign(
+        race_points=race_points,
+        fastest_lap=results["fastest_lap_rank"] == 1
+    ).groupby("driver_id").agg(
+        seasons=("season", "nunique"),
+        first_season=("season", "min"),
+        last_season=("season", "max"),
+        starts=("round", "size"),
+        wins=("win", "sum"),
+        podiums=("podium", "sum"),
+        top10_finishes=("top10_finish", "sum"),
+        fastest_laps=("fastest_lap", "sum"),
+        points=("race_points", "sum"),
+        best_finish=("position", "min")
+    )
+
+    qualifying_table = qualifying.assign(pole=qualifying["position"] == 1).groupby("driver_id").agg(
+        poles=("pole", "sum"),
+        mean_qualifying=("position", "mean")
+    )
+
+    # The leader of a running season is not a champion yet
+    finished = standings[standings["season"].map(is_finished).astype(bool)]
+    standings_table = standings.groupby("driver_id").agg(best_championship=("position", "min")).join(
+        (finished["position"] == 1).groupby(finished["driver_id"]).sum().rename("titles")
+    )
+
+    table = table.join(qualifying_table, how="outer").join(standings_table, how="outer")
+    table.insert(0, "driver", ids.drivers.names_for(table.index))
+    table["points_per_start"] = table["points"] / table["starts"]
+    table["titles"] = table["titles"].fillna(0).astype("int16")
+
+    return table.reset_index().sort_values("points", ascending=False, ignore_index=True)
+
+def get_career_data(seasons, drivers):
+    # Career table, curves and season standings of the drivers (driver_id codes) over the seasons.
+    # Seasons that fail to load are left out and listed under "failed"
+    with timer("get", "career"):
+        frames, failed = load_career_frames(sorted(seasons), list(drivers))
+
+        return {
+            "table": career_table(frames),
+            "curves": career_curves(frames["results"]),
+            "seasons": career_seasons(frames["standings"]),
+            "failed": failed
+        }
@@ -0,0 +1,183 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from functions.metrics import record_request
+
+# Shared HTTP client: every fetch in api/ goes through get_json so all of them reuse
+# pooled keep-alive connections and stay inside jolpica's published rate limits.
+
+# Point the app at another Ergast compatible server, e.g. the local stand-in in tools/ergast_server.py
+BASE_URL = os.environ.get("F1_API_BASE_URL", "https://api.jolpi.ca/ergast/f1").rstrip("/")
+
+# jolpica allows a burst of 4 requests per second and 500 requests per hour
+BURST_RATE = float(os.environ.get("F1_API_BURST_RATE", 4))
+HOURLY_LIMIT = float(os.environ.get("F1_API_HOURLY_LIMIT", 500))
+
+# Share of every rate bucket that background requests leave free for interactive ones
+BACKGROUND_RESERVE = float(os.environ.get("F1_API_BACKGROUND_RESERVE", 0.25))
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 30)
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+class FetchError(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, reserve=0):
+        # reserve is the share of the capacity that has to stay in the bucket after this request
+        needed = 1 + reserve * self.capacity
+        if self.tokens >= needed:
+            return 0
+        return (needed - self.tokens) / self.rate
+
+class RateLimiter:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+
+    def acquire(self, reserve=0):
+        # A request needs a token from every bucket, taken atomically so callers cannot interleave
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                for bucket in self.buckets:
+                    bucket.refill(now)
+
+                wait = max(bucket.wait_time(reserve) for bucket in self.buckets)
+                if wait == 0:
+                    for bucket in self.buckets:
+                        bucket.tokens -= 1
+                    return
+
+            _count("rate_limited_waits")
+            time.sleep(wait)
+
+def make_limiter(burst_rate, hourly_limit):
+    # A bucket needs room for at least one token, even when a share of the budget is below one request
+    return RateLimiter([
+        TokenBucket(burst_rate, max(1, burst_rate)),
+        TokenBucket(hourly_limit / 3600, max(1, hourly_limit))
+    ])
+
+limiter = make_limiter(BURST_RATE, HOURLY_LIMIT)
+
+def share_rate_budget(share):
+    # Processes fetching side by side each take their share of the published limits
+    global limiter
+    limiter = make_limiter(BURST_RATE * share, HOURLY_LIMIT * share)
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+stats = {"requests": 0, "background_requests": 0, "retries": 0, "throttled": 0, "failures": 0, "rate_limited_waits": 0}
+_stats_lock = threading.Lock()
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+def get_stats():
+    with _stats_lock:
+        return dict(stats)
+
+# Set for prefetching work, context variables follow asyncio tasks, asyncio.to_thread and in_caller_context
+_background = contextvars.ContextVar("background", default=False)
+
+@contextmanager
+def background():
+    # Requests made inside wait until the reserved share of the rate budget is left over
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+def in_caller_context(function):
+    # Executor threads do not inherit context variables, wrap what is submitted to one so its
+    # requests keep the caller's priority. Each call runs in its own copy, a context can only be
+    # entered by one thread at a time
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(function, *args)
+
+def backoff_delay(attempt, retry_after=None):
+    # Full jitter keeps concurrent retries from hammering the API in lockstep
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+
+    return delay
+
+def endpoint_name(url):
+    # ".../2023/results/" and ".../2023/5/results/" both report as "results"
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+def get_json(url, params=None):
+    last_error = None
+    endpoint = endpoint_name(url)
+
+    is_background = _background.get()
+
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(BACKGROUND_RESERVE if is_background else 0)
+        _count("requests")
+        if is_background:
+            _count("background_requests")
+
+        retry_after = None
+        start_time = time.perf_counter()
+
+        try:
+            response = session.get(url, params=params, timeout=TIMEOUT)
+        except requests.RequestException as error:
+            record_request(endpoint, time.perf_counter() - start_time, 0, 0)
+            last_error = error
+        else:
+            record_request(endpoint, time.perf_counter() - start_time, len(response.content), response.status_code)
+
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError as error:
+                    # A truncated body is worth another attempt
+                    last_error = error
+            elif response.status_code == 429:
+                _count("throttled")
+                retry_after = response.headers.get("Retry-After")
+                last_error = FetchError(f"{url} was throttled")
+            elif response.status_code >= 500:
+                last_error = FetchError(f"{url} returned status {response.status_code}")
+            else:
+                # Other client errors will not succeed on retry
+                _count("failures")
+                raise FetchError(f"{url} returned status {response.status_code}")
+
+        if attempt < MAX_RETRIES:
+            _count("retries")
+            time.sleep(backoff_delay(attempt, retry_after))
+
+    _count("failures")
+    raise FetchError(f"{url} failed after {MAX_RETRIES + 1} attempts") from last_error
@@ -1,42 +1,45 @@
-import requests
-import streamlit as st
-import xml.etree.ElementTree as ET
-import time
+import numpy as np
+import pandas as pd
+from functions.metrics import timer
+from api.store import load_season, save_season, is_fresh
+from api.cache import SeasonCache
+from api.pagination import fetch_all_pages
+from api.client import BASE_URL
+from api import ids
+
+cache = SeasonCache(is_fresh, "drivers")
+
+def fetch_drivers(year):
+    # API endpoint for the {year} season
+    drivers_url = f"{BASE_URL}/{year}/drivers/"
 
-cache = {}
+    # Early seasons list more drivers than fit on the default page
+    return fetch_all_pages(drivers_url, 'DriverTable', 'Drivers')
 
-def get_drivers_data(year):
-    if year in cache:
-        return cache[year]
+def build_drivers_frame(drivers):
+    # Only drivers with both names are listed
+    drivers = [driver for driver in drivers if driver.get('givenName') and driver.get('familyName')]
+    codes = np.fromiter((ids.drivers.code(driver.get('driverId'), driver) for driver in drivers), dtype=np.int32, count=len(drivers))
 
-    start_time = time.time()
+    return pd.DataFrame({
+        "given_name": [driver['givenName'] for driver in drivers],
+        "family_name": [driver['familyName'] for driver in drivers],
+        "driver_id": codes,
+        "driver": ids.drivers.names_for(codes)
+    })
 
-    drivers_array = []
+def load_drivers_data(year):
+    # Every load_*_data reads through the local season store and only hits the API on a miss,
+    # may raise FetchError
+    with timer("fetch", "drivers"):
+        drivers = load_season("drivers", year)
 
-    # API endpoint for the {year} season
-    drivers_url = f"https://api.jolpi.ca/ergast/f1/{year}/drivers/"
-
-    # Make the API request
-    drivers_response = requests.get(drivers_url)
-
-    # Check if the request was successful (status code 200)
-    if drivers_response.status_code == 200:
-        data = drivers_response.json()
-        drivers = data['MRData']['DriverTable']['Drivers']
-
-        for driver in drivers:
-            given_name = driver.get('givenName')
-            family_name = driver.get('familyName')
-
-            # Append the driver info to the list
-            if given_name and family_name:  
-                drivers_array.append({"given_name": given_name, "family_name": family_name})    
-    else:
-        st.error("Failed to retrieve data. Please try again later.")
-
-    cache[year] = drivers_array
-    
-    end_time = time.time()
-    print(f"Drivers API time: {end_time - start_time:.2f} seconds")
-   
-    return drivers_array
\ No newline at end of file
+        if drivers is None:
+            drivers = fetch_drivers(year)
+            save_season("drivers", year, drivers)
+
+    with timer("parse", "drivers"):
+        return build_drivers_frame(drivers)
+
+def get_drivers_data(year):
+    return cache.get(year, load_drivers_data)
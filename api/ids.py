@@ -0,0 +1,52 @@
+import threading
+import numpy as np
+
+# Ergast driverId / constructorId strings interned into dense integer codes for the life of the
+# process. Frames carry the codes (driver_id, constructor_id), every join and grouping runs on
+# them, and display names are looked up once per code instead of being rebuilt for every row.
+
+class Interner:
+    def __init__(self, name_of):
+        # name_of(record) builds the display name, only called the first time a key is seen
+        self.name_of = name_of
+        self.codes = {}
+        self.keys = []
+        self.names = []
+        self._lock = threading.Lock()
+
+    def code(self, key, record):
+        code = self.codes.get(key)
+        if code is not None and (self.names[code] != key or self.name_of(record) == key):
+            return code
+
+        with self._lock:
+            code = self.codes.get(key)
+            if code is None:
+                code = len(self.keys)
+                self.keys.append(key)
+                self.names.append(self.name_of(record))
+                self.codes[key] = code
+            else:
+                # The key stood in as the name, this record brings the real one
+                self.names[code] = self.name_of(record)
+
+        return code
+
+    def name(self, code):
+        return self.names[code]
+
+    def names_for(self, codes):
+        # Vectorized code -> display name, for the name columns of the frames
+        return np.asarray(self.names, dtype=object)[np.asarray(codes, dtype=np.intp)]
+
+    def keys_for(self, codes):
+        # Codes only hold within a process. Whatever outlives it (the season store, the parquet
+        # partitions) keeps the Ergast ids and interns them again when it is read back
+        return np.asarray(self.keys, dtype=object)[np.asarray(codes, dtype=np.intp)]
+
+# Lap timings only carry the driverId, it stands in until the driver is seen with a name
+drivers = Interner(lambda driver: f"{driver.get('givenName')} {driver.get('familyName')}" if driver.get('familyName') else driver.get('driverId'))
+constructors = Interner(lambda constructor: constructor.get('name'))
+
+# Stands in for results without a constructor
+UNKNOWN_CONSTRUCTOR = {"constructorId": "unknown", "name": "Unknown"}
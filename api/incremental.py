@@ -0,0 +1,44 @@
+from api.client import BASE_URL, FetchError
+from api.pagination import fetch_all_pages, fetch_rows_after
+from api.store import load_season, save_season, is_finished
+from functions.metrics import count
+
+# Per race endpoints of the running season are kept up to date incrementally: once a season
+# is stored, a refresh asks only for its last stored round and the rows after it instead of every
+# page again. Earlier rounds can still be reclassified later on, so the last refresh of a season,
+# once it is over, fetches it whole.
+
+# endpoint: per race list key
+ROUND_ENDPOINTS = {
+    "results": 'Results',
+    "sprint": 'SprintResults',
+    "qualifying": 'QualifyingResults'
+}
+
+def update_season(endpoint, year):
+    # Fresh copies are served from the store as they are, may raise FetchError
+    races = load_season(endpoint, year)
+    if races is not None:
+        return races
+
+    list_key = ROUND_ENDPOINTS[endpoint]
+    url = f"{BASE_URL}/{year}/{endpoint}/"
+
+    stored = load_season(endpoint, year, allow_stale=True)
+
+    try:
+        if stored is None or is_finished(year):
+            races = fetch_all_pages(url, 'RaceTable', 'Races', list_key)
+        else:
+            races = fetch_rows_after(url, stored, 'RaceTable', 'Races', list_key)
+    except FetchError:
+        if stored is None:
+            raise
+
+        # The last good copy, left stale in the store so the next load tries again
+        count("stale_store_fallbacks")
+        return stored
+
+    save_season(endpoint, year, races)
+
+    return races
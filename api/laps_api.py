@@ -0,0 +1,194 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from functions.time_converter import parse_lap_times, MISSING_MS
+from functions.metrics import timer, observe, count
+from api.store import load_season, save_season
+from api.cache import SeasonCache
+from api.pagination import fetch_page, remaining_offsets, MAX_WORKERS
+from api.client import BASE_URL, FetchError, in_caller_context
+from api import ids
+
+# Lap by lap timings of one race. /{year}/{round}/laps pages over every (lap, driver) timing,
+# a race is ten to twenty pages. Pages are decoded into flat arrays as they arrive and the raw
+# JSON is dropped right away. A race ends up as one int32 millisecond and one uint8 position
+# array in which every driver's laps are one contiguous run, lap 1 first, so a lap range of a
+# driver is a slice. A full race takes a few KB.
+#
+# Laps are loaded per race, on demand. A season of them would eat most of the hourly budget.
+
+# Published lap timings do not change, a race that has none yet is never stored or cached
+cache = SeasonCache(lambda key, stored_at: True, "laps")
+
+class RaceLaps:
+    def __init__(self, driver_ids, offsets, milliseconds, positions):
+        # driver i's laps are milliseconds[offsets[i]:offsets[i + 1]], missing laps are MISSING_MS / 0
+        self.driver_ids = driver_ids
+        self.offsets = offsets
+        self.milliseconds = milliseconds
+        self.positions = positions
+        self.index = {int(driver): row for row, driver in enumerate(driver_ids)}
+
+    @property
+    def laps(self):
+        return int(np.diff(self.offsets).max(initial=0))
+
+    @property
+    def nbytes(self):
+        return self.driver_ids.nbytes + self.offsets.nbytes + self.milliseconds.nbytes + self.positions.nbytes
+
+    def driver_laps(self, driver, first=1, last=None):
+        # (milliseconds, positions) of laps first..last of one driver, views into the race arrays
+        row = self.index.get(int(driver))
+        if row is None:
+            return self.milliseconds[:0], self.positions[:0]
+
+        start, end = self.offsets[row], self.offsets[row + 1]
+        stop = end if last is None else min(end, start + last)
+        start = min(stop, start + max(first, 1) - 1)
+
+        return self.milliseconds[start:stop], self.positions[start:stop]
+
+    def slice(self, drivers, first=1, last=None):
+        # Long frame of the given drivers over a lap range, one row per driver and lap
+        first = max(first, 1)
+        parts = [(driver, *self.driver_laps(driver, first, last)) for driver in drivers]
+
+        lengths = np.asarray([len(part[1]) for part in parts], dtype=np.int64)
+        driver_ids = np.repeat(np.asarray([part[0] for part in parts], dtype=np.int32), lengths)
+
+        # Lap numbers count up from first within each driver's run
+        run_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        laps = (np.arange(lengths.sum()) - run_starts + first).astype(np.int16)
+
+        milliseconds = np.concatenate([part[1] for part in parts] or [self.milliseconds[:0]])
+        positions = np.concatenate([part[2] for part in parts] or [self.positions[:0]])
+
+        return pd.DataFrame({
+            "lap": laps,
+            "driver_id": driver_ids,
+            "driver": pd.Categorical(ids.drivers.names_for(driver_ids)),
+            "lap_time": np.where(milliseconds != MISSING_MS, milliseconds / 1000, np.nan),
+            "position": pd.Series(positions, dtype="UInt8").mask(positions == 0)
+        })
+
+    def to_payload(self):
+        # The arrays as lists, one stored entry per race
+        return {
+            "drivers": ids.drivers.keys_for(self.driver_ids).tolist(),
+            "offsets": self.offsets.tolist(),
+            "milliseconds": self.milliseconds.tolist(),
+            "positions": self.positions.tolist()
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(
+            np.asarray([ids.drivers.code(key, {"driverId": key}) for key in payload["drivers"]], dtype=np.int32),
+            np.asarray(payload["offsets"], dtype=np.int64),
+            np.asarray(payload["milliseconds"], dtype=np.int32),
+            np.asarray(payload["positions"], dtype=np.uint8)
+        )
+
+def decode_page(page):
+    # (driver_id, lap, position, milliseconds) arrays of every timing on one page
+    drivers, laps, positions, times = [], [], [], []
+
+    for race in page['RaceTable']['Races']:
+        for lap in race.get('Laps', []):
+            number = int(lap['number'])
+
+            for timing in lap.get('Timings', []):
+                drivers.append(ids.drivers.code(timing['driverId'], timing))
+                laps.append(number)
+                positions.append(int(timing.get('position') or 0))
+                times.append(timing.get('time'))
+
+    milliseconds, valid, errors = parse_lap_times(times)
+
+    if errors:
+        count("lap_parse_errors", errors)
+
+    return (
+        np.asarray(drivers, dtype=np.int32),
+        np.asarray(laps, dtype=np.int64),
+        np.asarray(positions, dtype=np.uint8),
+        np.where(valid, milliseconds, MISSING_MS).astype(np.int32)
+    )
+
+def build_race_laps(chunks):
+    drivers, laps, positions, milliseconds = (np.concatenate(column) for column in zip(*chunks))
+
+    # Group the timings by driver, lap order within each driver
+    order = np.lexsort((laps, drivers))
+    drivers, laps, positions, milliseconds = drivers[order], laps[order], positions[order], milliseconds[order]
+
+    driver_ids, starts = np.unique(drivers, return_index=True)
+
+    # Every driver gets a slot per lap up to their last one, laps without a timing stay missing
+    lap_counts = np.maximum.reduceat(laps, starts) if len(starts) else np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lap_counts)]).astype(np.int64)
+
+    slots = offsets[np.searchsorted(driver_ids, drivers)] + laps - 1
+
+    race_milliseconds = np.full(offsets[-1], MISSING_MS, dtype=np.int32)
+    race_positions = np.zeros(offsets[-1], dtype=np.uint8)
+    race_milliseconds[slots] = milliseconds
+    race_positions[slots] = positions
+
+    return RaceLaps(driver_ids.astype(np.int32), offsets, race_milliseconds, race_positions)
+
+def fetch_laps(year, round_number):
+    url = f"{BASE_URL}/{year}/{round_number}/laps/"
+
+    first_page = fetch_page(url, 0)
+    limit, offsets = remaining_offsets(first_page)
+
+    decode_time = time.perf_counter()
+    chunks = [decode_page(first_page)]
+    decode_seconds = time.perf_counter() - decode_time
+
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(offsets))) as executor:
+            # map hands the pages over as they come in, each one is decoded and let go
+            for page in executor.map(in_caller_context(lambda offset: fetch_page(url, offset, limit)), offsets):
+                decode_time = time.perf_counter()
+                chunks.append(decode_page(page))
+                decode_seconds += time.perf_counter() - decode_time
+
+    observe("parse", "laps", decode_seconds)
+
+    rows = sum(len(chunk[0]) for chunk in chunks)
+    total = int(first_page.get('total', 0))
+
+    if rows < total:
+        raise FetchError(f"{url} returned {rows} of {total} rows")
+
+    if not rows:
+        raise FetchError(f"{url} has no lap timings yet")
+
+    return build_race_laps(chunks)
+
+def load_laps_data(key):
+    year, round_number = key
+
+    # Read through the local season store, one entry per race, may raise FetchError
+    with timer("fetch", "laps"):
+        stored = load_season(f"laps/{round_number}", year, allow_stale=True)
+
+        if stored is not None:
+            race_laps = RaceLaps.from_payload(stored)
+        else:
+            race_laps = fetch_laps(year, round_number)
+            save_season(f"laps/{round_number}", year, race_laps.to_payload())
+
+    # Memory of the races loaded, over the laps_races count it is what one race costs
+    count("laps_races")
+    count("laps_bytes", race_laps.nbytes)
+
+    return race_laps
+
+def get_laps_data(year, round_number):
+    # Raises FetchError as well when the race has no lap timings yet
+    return cache.get((int(year), int(round_number)), load_laps_data)
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from api.client import get_json, in_caller_context, FetchError
+from functions.metrics import count
+
+# Largest page size jolpica accepts, anything above is clamped server side
+PAGE_LIMIT = 100
+
+# Upper bound on pages in flight for a single endpoint
+MAX_WORKERS = 4
+
+def fetch_page(url, offset, limit=PAGE_LIMIT):
+    return get_json(url, params={"limit": limit, "offset": offset})['MRData']
+
+def remaining_offsets(first_page):
+    # The server may clamp the requested limit, so page with what it actually used
+    total = int(first_page.get('total', 0))
+    limit = int(first_page.get('limit', PAGE_LIMIT)) or PAGE_LIMIT
+    return limit, range(limit, total, limit)
+
+def merge_pages(pages, table_key, items_key, list_key=None):
+    merged = []
+    by_round = {}
+
+    for page in pages:
+        for item in page[table_key][items_key]:
+            if list_key is None:
+                merged.append(item)
+                continue
+
+            # A race split across a page boundary shows up on both pages, stitch its rows back together
+            key = (item.get('season'), item.get('round'))
+            if key in by_round:
+                by_round[key][list_key].extend(item.get(list_key, []))
+            else:
+                item[list_key] = list(item.get(list_key, []))
+                by_round[key] = item
+                merged.append(item)
+
+    return merged
+
+def check_complete(url, first_page, merged, list_key=None):
+    # A season with rows missing must never reach the store, it would be served as complete forever
+    total = int(first_page.get('total', 0))
+
+    if list_key is None:
+        rows = len(merged)
+    else:
+        rows = sum(len(item.get(list_key, [])) for item in merged)
+
+    if rows < total:
+        raise FetchError(f"{url} returned {rows} of {total} rows")
+
+    return merged
+
+def fetch_all_pages(url, table_key, items_key, list_key=None):
+    # The first page tells how many rows exist, so only the pages actually needed are requested
+    first_page = fetch_page(url, 0)
+
+    limit, offsets = remaining_offsets(first_page)
+
+    pages = [first_page]
+
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(offsets))) as executor:
+            # map keeps offset order, so the stitched rows stay in API order
+            pages.extend(executor.map(in_caller_context(lambda offset: fetch_page(url, offset, limit)), offsets))
+
+    return check_complete(url, first_page, merge_pages(pages, table_key, items_key, list_key), list_key)
+
+def fetch_rows_after(url, stored, table_key, items_key, list_key):
+    # Ergast lists rows in round order. The last stored round may have been stored before all of its
+    # rows were in, or before a penalty changed them, so it is refetched with everything after it
+    # and replaces the stored one. Returns the stored races brought up to date, one request when
+    # nothing changed.
+    kept = stored[:-1]
+    kept_rows = sum(len(item.get(list_key, [])) for item in kept)
+
+    # The fetch starts on the last kept row, if that one moved an earlier round gained or lost rows
+    # and the stored offsets no longer line up with the server's
+    offset = max(kept_rows - 1, 0)
+    first_page = fetch_page(url, offset)
+
+    total = int(first_page.get('total', 0))
+    limit = int(first_page.get('limit', PAGE_LIMIT)) or PAGE_LIMIT
+
+    pages = [first_page]
+    pages.extend(fetch_page(url, page_offset, limit) for page_offset in range(offset + limit, total, limit))
+
+    fetched = merge_pages(pages, table_key, items_key, list_key)
+
+    if kept_rows:
+        last_kept = kept[-1]
+        overlap = fetched[0] if fetched else {}
+
+        if (overlap.get('season'), overlap.get('round')) != (last_kept.get('season'), last_kept.get('round')) \
+                or overlap.get(list_key) != last_kept[list_key][-1:]:
+            count("incremental_realignments")
+            return fetch_all_pages(url, table_key, items_key, list_key)
+
+        fetched = fetched[1:]
+
+    return check_complete(url, first_page, kept + fetched, list_key)
@@ -0,0 +1,159 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from functions.time_converter import parse_lap_times
+from functions.metrics import timer, observe, count
+from api.store import load_season, save_season, is_fresh
+from api.cache import SeasonCache
+from api.pagination import fetch_all_pages, MAX_WORKERS
+from api.client import BASE_URL, FetchError, in_caller_context
+from api.incremental import update_season
+from api import ids
+import functions.driver_index  # registers frame.by_driver
+
+# Pit stops of a whole season. Ergast only serves them per round, so a season is one paged
+# fetch per round that has been run (the rounds come from the results), all rounds at once.
+# The season is stored as columns, one list per field with one entry per stop, and a stale copy
+# of the running season only refetches its last round with stops and the rounds without any.
+# Ergast has pit stop data from 2011 on, earlier seasons come back empty.
+
+cache = SeasonCache(is_fresh, "pitstops")
+
+PITSTOPS_DTYPES = {
+    "round": "int16",
+    "race_name": "category",
+    "driver_id": "int32",
+    "driver": "category",
+    "stop": "int8",
+    "lap": "int16"
+}
+
+def fetch_round(year, round_number):
+    return fetch_all_pages(f"{BASE_URL}/{year}/{round_number}/pitstops/", 'RaceTable', 'Races', 'PitStops')
+
+def season_columns(races):
+    # One list per field with one entry per stop, the drivers as their Ergast ids
+    columns = {"round": [], "race_name": [], "driver": [], "stop": [], "lap": [], "duration": []}
+
+    for race in races:
+        round_number = int(race['round'])
+        race_name = race.get('raceName')
+
+        for pit_stop in race.get('PitStops', []):
+            columns["round"].append(round_number)
+            columns["race_name"].append(race_name)
+            columns["driver"].append(pit_stop.get('driverId'))
+            columns["stop"].append(int(pit_stop.get('stop', 0)))
+            columns["lap"].append(int(pit_stop.get('lap', 0)))
+            columns["duration"].append(pit_stop.get('duration'))
+
+    return columns
+
+def update_pitstops(year):
+    # Fresh copies are served from the store as they are, may raise FetchError
+    stored = load_season("pitstops", year)
+    if stored is not None:
+        return stored
+
+    stored = load_season("pitstops", year, allow_stale=True)
+    rounds = sorted({int(race['round']) for race in update_season("results", year)})
+
+    # Rounds stored without stops were fetched before they were published, several of them after a
+    # double header. The last round with stops may have been stored before all of them were in
+    stop_rounds = set(stored["round"]) if stored is not None else set()
+    kept_rounds = stop_rounds - {max(stop_rounds)} if stop_rounds else set()
+    missing = [round_number for round_number in rounds if round_number not in kept_rounds]
+
+    races = []
+    if missing:
+        try:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(missing))) as executor:
+                for round_races in executor.map(in_caller_context(lambda round_number: fetch_round(year, round_number)), missing):
+                    races.extend(round_races)
+        except FetchError:
+            if stored is None:
+                raise
+
+            # The last good copy, left stale in the store so the next load tries again
+            count("stale_store_fallbacks")
+            return stored
+
+    fetched = season_columns(races)
+
+    if stored is None:
+        columns = fetched
+    else:
+        keep = [index for index, round_number in enumerate(stored["round"]) if round_number in kept_rounds]
+        columns = {name: [stored[name][index] for index in keep] + fetched[name] for name in fetched}
+
+    payload = {"rounds": rounds, **columns}
+    save_season("pitstops", year, payload)
+
+    return payload
+
+def build_pitstops_frame(payload):
+    start_time = time.perf_counter()
+
+    milliseconds, valid, errors = parse_lap_times(payload.get("duration", []))
+    if errors:
+        count("pitstop_duration_parse_errors", errors)
+
+    driver_ids = np.fromiter(
+        (ids.drivers.code(key, {"driverId": key}) for key in payload.get("driver", [])),
+        dtype=np.int32,
+        count=len(payload.get("driver", []))
+    )
+
+    pitstops = pd.DataFrame({
+        "round": payload.get("round", []),
+        "race_name": payload.get("race_name", []),
+        "driver_id": driver_ids,
+        "driver": ids.drivers.names_for(driver_ids),
+        "stop": payload.get("stop", []),
+        "lap": payload.get("lap", []),
+        "duration_ms": pd.arrays.IntegerArray(np.where(valid, milliseconds, 0).astype(np.int32), ~valid)
+    }).astype(PITSTOPS_DTYPES).sort_values(["round", "driver_id", "stop"], kind="stable", ignore_index=True)
+
+    derive_time = time.perf_counter()
+    observe("parse", "pitstops", derive_time - start_time)
+
+    # Stop time against the median stop of the same race, negative is quicker than the field
+    median_ms = pitstops["duration_ms"].astype("float64").groupby(pitstops["round"]).transform("median")
+    pitstops["duration"] = (pitstops["duration_ms"] / 1000).astype("Float64")
+    pitstops["delta_to_median"] = ((pitstops["duration_ms"] - median_ms) / 1000).astype("Float64")
+
+    observe("derive", "pitstops", time.perf_counter() - derive_time)
+
+    return pitstops
+
+def strategy_table(pitstops):
+    # One row per driver: how often and how quickly they stopped over the season
+    by_driver = pitstops.groupby("driver_id", sort=False)
+
+    table = by_driver.agg(
+        driver=("driver", "first"),
+        races=("round", "nunique"),
+        stops=("stop", "size"),
+        mean_duration=("duration", "mean"),
+        fastest_duration=("duration", "min"),
+        mean_delta=("delta_to_median", "mean")
+    )
+    table["stops_per_race"] = table["stops"] / table["races"]
+
+    return table.reset_index()
+
+def load_pitstops_data(year):
+    # Read through the local season store, only the missing rounds hit the API, may raise FetchError
+    with timer("fetch", "pitstops"):
+        payload = update_pitstops(year)
+
+    pitstops = build_pitstops_frame(payload)
+
+    with timer("index", "pitstops"):
+        pitstops.by_driver
+
+    return pitstops
+
+def get_pitstops_data(year):
+    return cache.get(year, load_pitstops_data)
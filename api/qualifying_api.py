@@ -1,187 +1,167 @@
-import requests
-import streamlit as st
-import xml.etree.ElementTree as ET
-from functions.time_converter import time_to_seconds 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from functions.time_converter import parse_lap_times
 import time
+from functions.metrics import timer, observe, count
+from api.store import is_fresh
+from api.cache import SeasonCache
+from api.incremental import update_season
+from api import ids
+import functions.driver_index  # registers frame.by_driver
+
+cache = SeasonCache(is_fresh, "qualifying")
+
+SESSIONS = ["q1", "q2", "q3"]
+
+QUALIFYING_DTYPES = {
+    "given_name": "category",
+    "family_name": "category",
+    "driver_id": "int32",
+    "driver": "category",
+    "constructor_id": "int32",
+    "constructor_name": "category",
+    "position": "int16",
+    "season": "int16",
+    "round": "int16",
+    "race_name": "category",
+    "circuit_name": "category",
+    "date": "category"
+}
+
+def fetch_qualifyings(year):
+    # A stale copy of the running season only gets the rows published since
+    return update_season("qualifying", year)
+
+def build_qualifying_frame(all_qualifyings):
+    start_time = time.perf_counter()
+
+    columns = {name: [] for name in (
+        "given_name", "family_name", "driver_id", "constructor_id", "position", "q1", "q2", "q3",
+        "season", "round", "race_name", "circuit_name", "date"
+    )}
+
+    for qualifying in sorted(all_qualifyings, key=lambda r: int(r['round'])):
+        season = int(qualifying.get('season'))
+        round_number = int(qualifying.get('round'))
 
-cache = {}
+        # Extract race name and circuit details
+        race_name = qualifying.get('raceName')
+        circuit_name = qualifying.get('Circuit').get('circuitName')
+        date = qualifying.get('date')
 
-def fetch_qualifying(year, offset):
-    qualifying_url = f"https://api.jolpi.ca/ergast/f1/{year}/qualifying?limit=30&offset={offset}"
-    response = requests.get(qualifying_url)
-    return response
+        for result in qualifying.get('QualifyingResults') or []:
+            driver = result.get('Driver') or {}
+            constructor = result.get('Constructor') or ids.UNKNOWN_CONSTRUCTOR
 
-def get_qualifying_data(year):
-    if year in cache:
-        return cache[year]
+            columns["given_name"].append(driver.get('givenName'))
+            columns["family_name"].append(driver.get('familyName'))
+            columns["driver_id"].append(ids.drivers.code(driver.get('driverId'), driver))
+            columns["constructor_id"].append(ids.constructors.code(constructor.get('constructorId'), constructor))
+            columns["position"].append(int(result.get('position')))
 
-    start_time = time.time()
+            # Drivers knocked out earlier have no later session times
+            columns["q1"].append(result.get('Q1'))
+            columns["q2"].append(result.get('Q2'))
+            columns["q3"].append(result.get('Q3'))
 
-    qualifying_array = []
-    all_qualifyings = []
+            columns["season"].append(season)
+            columns["round"].append(round_number)
+            columns["race_name"].append(race_name)
+            columns["circuit_name"].append(circuit_name)
+            columns["date"].append(date)
 
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        max_offset = 500
-        futures = {
-            executor.submit(fetch_qualifying, year, offset): offset
-            for offset in range(0, max_offset + 1, 30)
-        }
+    parse_errors = 0
 
-        for future in as_completed(futures):
-            qualifying_response = future.result()
-            if qualifying_response.status_code == 200:
-                races = qualifying_response.json()['MRData']['RaceTable']['Races']
-                if not races:
-                    continue
-                all_qualifyings.extend(races)
+    for session in SESSIONS:
+        # Missing and invalid laps are masked out, so they drop out of every min/max below
+        milliseconds, valid, errors = parse_lap_times(columns[session])
+        columns[f"{session}_ms"] = pd.arrays.IntegerArray(milliseconds, ~valid)
+        parse_errors += errors
 
-    # Sort races by round
-    all_qualifyings.sort(key=lambda r: int(r['round']))
+    if parse_errors:
+        count("qualifying_lap_parse_errors", parse_errors)
 
-    for qualifying in all_qualifyings:
-        season = qualifying.get('season') 
-        round_number = qualifying.get('round') 
+    qualifying = pd.DataFrame(columns)
 
-        # Extract race name and circuit details
-        race_name = qualifying.get('raceName')
-        circuit_name = qualifying.get('Circuit').get('circuitName')
-        date = qualifying.get('date')
-                               
-        # Extract qualifying results
-        qualifying_results = qualifying.get('QualifyingResults')
-
-        if qualifying_results is None:
-            continue 
-
-        for result in qualifying_results:
-            position = result.get('position') 
-
-            driver = result.get('Driver')
-
-            if driver is not None:
-                given_name = driver.get('givenName')
-                family_name = driver.get('familyName')
-                                          
-            constructor = result.get('Constructor')
-            if constructor is not None:
-                constructor_name = constructor.get('name')
-
-            # Extract the Q1, Q2, and Q3 times
-            q1 = result.get('Q1')
-            q2 = result.get('Q2')
-            q3 = result.get('Q3')
-
-            q1_sec = time_to_seconds(q1)
-            q2_sec = time_to_seconds(q2)
-            q3_sec = time_to_seconds(q3)
-
-            # Append the collected data to the qualifying_array
-            qualifying_array.append({
-                "given_name": given_name,
-                "family_name": family_name,
-                "constructor_name": constructor_name,
-                "position": position,
-                "q1": q1,
-                "q1_sec": q1_sec,
-                "q2": q2,
-                "q2_sec": q2_sec,
-                "q3": q3,
-                "q3_sec": q3_sec,
-                "season": season,
-                "round": round_number,
-                "race_name": race_name,
-                "circuit_name": circuit_name,
-                "date": date
-            })
-
-    ####### Q1 difference #######
-        
-    fastest_q1_dict = {}
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        q1_time = entry["q1"]
-        q1_seconds = entry["q1_sec"]
-
-        if q1_seconds != float('inf'):
-            if round_number not in fastest_q1_dict or q1_seconds < fastest_q1_dict[round_number]["q1_seconds"]:
-                fastest_q1_dict[round_number] = {
-                    "fastest_q1": q1_time,
-                    "q1_seconds": q1_seconds
-                }
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        
-        if str(round_number) in fastest_q1_dict:
-            entry["fastest_q1_time"] = fastest_q1_dict[str(round_number)]["fastest_q1"] 
-            if entry["q1_sec"] == float('inf'):
-                entry["difference_fastest_q1_time"] = None
-            else:
-                entry["difference_fastest_q1_time"] = entry["q1_sec"] - fastest_q1_dict[str(round_number)]["q1_seconds"]
-        else:
-            entry["difference_fastest_q1_time"] = None
-
-    ####### Q2 difference #######
-            
-    fastest_q2_dict = {}
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        q2_time = entry["q2"]
-        q2_seconds = entry["q2_sec"]
-
-        if q2_seconds != float('inf'):
-            if round_number not in fastest_q2_dict or q2_seconds < fastest_q2_dict[round_number]["q2_seconds"]:
-                fastest_q2_dict[round_number] = {
-                    "fastest_q2": q2_time,
-                    "q2_seconds": q2_seconds
-                }
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        
-        if str(round_number) in fastest_q2_dict:
-            entry["fastest_q2_time"] = fastest_q2_dict[str(round_number)]["fastest_q2"] 
-            if entry["q2_sec"] == float('inf'):
-                entry["difference_fastest_q2_time"] = None
-            else:
-                entry["difference_fastest_q2_time"] = entry["q2_sec"] - fastest_q2_dict[str(round_number)]["q2_seconds"]
-        else:
-            entry["difference_fastest_q2_time"] = None
-
-    ####### Q3 difference #######
-            
-    fastest_q3_dict = {}
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        q3_time = entry["q3"]
-        q3_seconds = entry["q3_sec"]
-
-        if q3_seconds != float('inf'):
-            if round_number not in fastest_q3_dict or q3_seconds < fastest_q3_dict[round_number]["q3_seconds"]:
-                fastest_q3_dict[round_number] = {
-                    "fastest_q3": q3_time,
-                    "q3_seconds": q3_seconds
-                }
-
-    for entry in qualifying_array:
-        round_number = entry["round"]
-        
-        if str(round_number) in fastest_q3_dict:
-            entry["fastest_q3_time"] = fastest_q3_dict[str(round_number)]["fastest_q3"] 
-            if entry["q3_sec"] == float('inf'):
-                entry["difference_fastest_q3_time"] = None
-            else:
-                entry["difference_fastest_q3_time"] = entry["q3_sec"] - fastest_q3_dict[str(round_number)]["q3_seconds"]
-        else:
-            entry["difference_fastest_q3_time"] = None 
-
-    cache[year] = qualifying_array
-
-    end_time = time.time()
-    print(f"Qualifying API time: {end_time - start_time:.2f} seconds")
-    
-    return qualifying_array
\ No newline at end of file
+    # Display names come from the name dictionaries, looked up once per code
+    qualifying.insert(3, "driver", ids.drivers.names_for(qualifying["driver_id"]))
+    qualifying.insert(5, "constructor_name", ids.constructors.names_for(qualifying["constructor_id"]))
+
+    derive_time = time.perf_counter()
+    observe("parse", "qualifying", derive_time - start_time)
+
+    qualifying = add_session_gaps(qualifying).astype(QUALIFYING_DTYPES)
+
+    observe("derive", "qualifying", time.perf_counter() - derive_time)
+
+    return qualifying
+
+def extend_qualifying_frame(previous, all_qualifyings):
+    # Gaps only compare laps within a round, so the rounds already built are kept as they are
+    # and only the last one (it may have been half published) and the new ones are rebuilt
+    from_round = int(previous["round"].max()) if len(previous) else 0
+
+    kept = previous[previous["round"] < from_round]
+    rebuilt = build_qualifying_frame([race for race in all_qualifyings if int(race['round']) >= from_round])
+
+    # Concatenating an empty frame would turn the lap time columns into plain objects
+    if kept.empty:
+        return rebuilt
+
+    # Kept and rebuilt rows never share their categories (one holds the names of the new round,
+    # the other of the earlier ones), the astype rebuilds them over the whole season
+    return pd.concat([kept, rebuilt], ignore_index=True).astype(QUALIFYING_DTYPES)
+
+def add_session_gaps(qualifying):
+    # All sessions of all rounds at once: a rows x sessions block of lap times grouped by (season, round)
+    lap_columns = [f"{session}_ms" for session in SESSIONS]
+    times = qualifying[lap_columns]
+
+    by_round = [qualifying["season"], qualifying["round"]]
+    by_team = by_round + [qualifying["constructor_id"]]
+
+    fastest = times.groupby(by_round).transform("min")
+
+    # With two cars per team the teammate's lap is the team total minus the driver's own
+    team_total = times.groupby(by_team).transform("sum", min_count=1)
+    team_laps = times.notna().groupby(by_team).transform("sum")
+    teammate = (team_total - times).where((team_laps == 2) & times.notna())
+
+    # The cutoff of a session is the slowest lap that still made it into the next one
+    advanced = times.iloc[:, 1:].notna().to_numpy()
+    through = times.iloc[:, :-1].where(advanced)
+    cutoff = through.groupby(by_round).transform("max")
+    cutoff[lap_columns[-1]] = pd.NA
+
+    for index, session in enumerate(SESSIONS):
+        column = lap_columns[index]
+        is_fastest = times[column] == fastest[column]
+
+        qualifying[f"fastest_{session}_time"] = qualifying[session].where(is_fastest).groupby(by_round).transform("first")
+
+        # Gaps are exact integer milliseconds, the charts show them in seconds
+        qualifying[f"difference_fastest_{session}_time"] = (times[column] - fastest[column]) / 1000
+        qualifying[f"difference_teammate_{session}_time"] = (times[column] - teammate[column]) / 1000
+        qualifying[f"difference_cutoff_{session}_time"] = (times[column] - cutoff[column]) / 1000
+
+    return qualifying
+
+def load_qualifying_data(year):
+    # With a stale frame still in the cache, only the new rounds get their session gaps derived
+    previous = cache.peek(year)
+
+    # May raise FetchError, nothing incomplete is stored
+    with timer("fetch", "qualifying"):
+        all_qualifyings = fetch_qualifyings(year)
+
+    if previous is not None:
+        qualifying = extend_qualifying_frame(previous, all_qualifyings)
+    else:
+        qualifying = build_qualifying_frame(all_qualifyings)
+
+    with timer("index", "qualifying"):
+        qualifying.by_driver
+
+    return qualifying
+
+def get_qualifying_data(year):
+    return cache.get(year, load_qualifying_data)
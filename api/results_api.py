@@ -1,161 +1,190 @@
-import requests
-import streamlit as st
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 import time
-
-cache = {}
-
-def fetch_round_data(year, offset):
-    base_url = f"https://api.jolpi.ca/ergast/f1/{year}"
-    results_url = f"{base_url}/results/?limit=30&offset={offset}"
-    sprint_url = f"{base_url}/sprint/?limit=30&offset={offset}"
-
-    results_response = requests.get(results_url)
-    sprint_response = requests.get(sprint_url)
-
-    return (results_response, sprint_response)
-
-def get_results_data(year):
-    if year in cache:
-        return cache[year]
-    
-    start_time = time.time()
-
-    results_array = []
-    driver_points = {} 
-    driver_wins = {} 
-    driver_podiums = {}
-    driver_top10_finishes = {}
-    driver_fastest_laps = {}
-    driver_sprint_wins = {}
-    driver_sprint_podiums = {}
-    driver_sprint_top8_finishes = {}
-
-    all_races = []
-    all_sprints = []
-
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        max_offset = 500
-        futures = {
-            executor.submit(fetch_round_data, year, offset): offset
-            for offset in range(0, max_offset + 1, 30)
-        }
-
-        for future in as_completed(futures):
-            results_response, sprint_response = future.result()
-            if results_response.status_code == 200:
-                all_races.extend(results_response.json()['MRData']['RaceTable']['Races'])
-            if sprint_response.status_code == 200:
-                all_sprints.extend(sprint_response.json()['MRData']['RaceTable']['Races'])
-
-    # Index sprints by round for quick lookup
-    sprint_by_round = {s['round']: s for s in all_sprints}
-
-    # Sort races by round
-    all_races.sort(key=lambda r: int(r['round']))
-
-    for race in all_races:
-        round_number = race.get('round')
+from api.store import is_fresh
+from api.cache import SeasonCache
+from functions.metrics import timer, observe
+from api.incremental import update_season
+from api.client import in_caller_context
+from api import ids
+import functions.driver_index  # registers frame.by_driver
+import functions.season_totals  # registers frame.cumulative
+
+cache = SeasonCache(is_fresh, "results")
+
+RESULTS_DTYPES = {
+    "given_name": "category",
+    "family_name": "category",
+    "driver_id": "int32",
+    "driver": "category",
+    "constructor_id": "int32",
+    "constructor_name": "category",
+    "position": "int16",
+    "points": "float32",
+    "status": "category",
+    "fastest_lap_rank": "Int8",
+    "season": "int16",
+    "round": "int16",
+    "race_name": "category",
+    "circuit_name": "category",
+    "date": "category",
+    "sprint_position": "Int8",
+    "sprint_points": "float32",
+    "sprint_status": "category",
+    "sprint_date": "category"
+}
+
+def fetch_results(year):
+    # Results and sprint are independent endpoints, bring both up to date at once
+    update = in_caller_context(update_season)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results_future = executor.submit(update, "results", year)
+        sprint_future = executor.submit(update, "sprint", year)
+
+        all_races = results_future.result()
+        all_sprints = sprint_future.result()
+
+    return all_races, all_sprints
+
+def build_results_frame(all_races, all_sprints):
+    start_time = time.perf_counter()
+
+    # One pass over the raw races straight into typed columns, no per-row dicts
+    columns = {name: [] for name in (
+        "given_name", "family_name", "driver_id", "constructor_id", "position", "points", "status",
+        "fastest_lap_rank", "season", "round", "race_name", "circuit_name", "date"
+    )}
+
+    for race in sorted(all_races, key=lambda r: int(r['round'])):
+        season = int(race.get('season'))
+        round_number = int(race.get('round'))
         race_name = race.get('raceName')
         circuit_name = race['Circuit'].get('circuitName')
         date = race.get('date')
-        results = race.get('Results')
-
-        sprint = sprint_by_round.get(round_number)
-        sprint_results = sprint.get('SprintResults') if sprint else []
 
-        sprint_driver_map = {}
-        for sprint_result in sprint_results:
-            d = sprint_result.get('Driver')
-            key = f"{d.get('givenName')} {d.get('familyName')}"
-            sprint_driver_map[key] = sprint_result
-
-        for result in results:
+        for result in race.get('Results'):
             driver = result.get('Driver')
             if not driver:
                 continue
-            given_name = driver.get('givenName')
-            family_name = driver.get('familyName')
-            driver_key = f"{given_name} {family_name}"
 
-            constructor = result.get('Constructor')
-            constructor_name = constructor.get('name') if constructor else "Unknown"
-
-            position = int(result.get('position', 99))
-            status = result.get('status')
-            points = float(result.get('points', 0))
+            constructor = result.get('Constructor') or ids.UNKNOWN_CONSTRUCTOR
+            rank = result.get('FastestLap', {}).get('rank')
 
-            win = 1 if position == 1 else 0
-            podium = 1 if position <= 3 else 0
-            top10 = 1 if position <= 10 else 0
+            columns["given_name"].append(driver.get('givenName'))
+            columns["family_name"].append(driver.get('familyName'))
+            columns["driver_id"].append(ids.drivers.code(driver.get('driverId'), driver))
+            columns["constructor_id"].append(ids.constructors.code(constructor.get('constructorId'), constructor))
+            columns["position"].append(int(result.get('position', 99)))
+            columns["points"].append(float(result.get('points', 0)))
+            columns["status"].append(result.get('status'))
+            columns["fastest_lap_rank"].append(int(rank) if rank and rank.isdigit() else None)
+            columns["season"].append(season)
+            columns["round"].append(round_number)
+            columns["race_name"].append(race_name)
+            columns["circuit_name"].append(circuit_name)
+            columns["date"].append(date)
+
+    results = pd.DataFrame(columns)
+
+    # Display names come from the name dictionaries, looked up once per code
+    results.insert(3, "driver", ids.drivers.names_for(results["driver_id"]))
+    results.insert(5, "constructor_name", ids.constructors.names_for(results["constructor_id"]))
+
+    sprint_columns = {"round": [], "driver_id": [], "sprint_position": [], "sprint_points": [], "sprint_status": []}
+
+    for sprint in all_sprints:
+        for sprint_result in sprint.get('SprintResults', []):
+            d = sprint_result.get('Driver')
+            sprint_columns["round"].append(int(sprint.get('round')))
+            sprint_columns["driver_id"].append(ids.drivers.code(d.get('driverId'), d))
+            sprint_columns["sprint_position"].append(int(sprint_result.get('position', 99)))
+            sprint_columns["sprint_points"].append(float(sprint_result.get('points', 0)))
+            sprint_columns["sprint_status"].append(sprint_result.get('status'))
+
+    # Sprint rows attach to the race row of the same round and driver
+    results = results.merge(pd.DataFrame(sprint_columns), on=["round", "driver_id"], how="left")
+
+    # Every row of a sprint weekend carries the sprint date, even for drivers without a sprint result
+    sprint_dates = {int(s['round']): s.get('date') for s in all_sprints}
+    results["sprint_date"] = results["round"].map(sprint_dates)
+
+    derive_time = time.perf_counter()
+    observe("parse", "results", derive_time - start_time)
+
+    results["win"] = (results["position"] == 1).astype("int8")
+    results["podium"] = (results["position"] <= 3).astype("int8")
+    results["top10_finish"] = (results["position"] <= 10).astype("int8")
+    fastest_lap = (results["fastest_lap_rank"] == 1).astype("int8")
+
+    sprint_position = results["sprint_position"]
+    sprint_win = (sprint_position == 1).astype("int8")
+    sprint_podium = (sprint_position <= 3).astype("int8")
+    sprint_top8 = (sprint_position <= 8).astype("int8")
+
+    # Running season totals per driver, sprint points count towards the points total
+    by_driver = results["driver_id"]
+    results["total_points"] = (results["points"] + results["sprint_points"].fillna(0)).groupby(by_driver).cumsum().astype("float32")
+    results["total_wins"] = results["win"].groupby(by_driver).cumsum().astype("int16")
+    results["total_podiums"] = results["podium"].groupby(by_driver).cumsum().astype("int16")
+    results["total_top10_finishes"] = results["top10_finish"].groupby(by_driver).cumsum().astype("int16")
+    results["total_fastest_laps"] = fastest_lap.groupby(by_driver).cumsum().astype("int16")
+    results["total_sprint_wins"] = sprint_win.groupby(by_driver).cumsum().astype("int16")
+    results["total_sprint_podiums"] = sprint_podium.groupby(by_driver).cumsum().astype("int16")
+    results["total_sprint_top8_finishes"] = sprint_top8.groupby(by_driver).cumsum().astype("int16")
+
+    results = results.astype(RESULTS_DTYPES)
+
+    observe("derive", "results", time.perf_counter() - derive_time)
+
+    return results
+
+def extend_results_frame(previous, all_races, all_sprints):
+    # Rounds before the last one already built cannot change. Only that round (it may have been
+    # half published, the same goes for the last sprint) and the new ones are rebuilt, their
+    # running totals carry on from before
+    rounds = previous["round"].to_numpy()
+    sprint_rounds = rounds[previous["sprint_position"].notna().to_numpy()]
+
+    from_round = int(rounds.max(initial=0))
+    if len(sprint_rounds):
+        from_round = min(from_round, int(sprint_rounds.max()))
+
+    kept = previous[previous["round"] < from_round]
+    rebuilt = build_results_frame(
+        [race for race in all_races if int(race['round']) >= from_round],
+        [sprint for sprint in all_sprints if int(sprint['round']) >= from_round]
+    )
+
+    totals = [column for column in rebuilt.columns if column.startswith("total_")]
+    carried = kept.groupby("driver_id")[totals].last()
+    offsets = carried.reindex(rebuilt["driver_id"]).fillna(0).to_numpy()
+
+    for index, column in enumerate(totals):
+        rebuilt[column] = (rebuilt[column].to_numpy() + offsets[:, index]).astype(rebuilt[column].dtype)
+
+    # The new rounds bring race names, circuits and dates the kept rows do not have, the concat
+    # turns those columns into objects and the astype makes categories of them again
+    return pd.concat([kept, rebuilt], ignore_index=True).astype(RESULTS_DTYPES)
+
+def load_results_data(year):
+    # A stale frame still in the cache only needs the new rounds added, their totals carry on from it
+    previous = cache.peek(year)
+
+    # May raise FetchError, nothing incomplete is stored
+    with timer("fetch", "results"):
+        all_races, all_sprints = fetch_results(year)
+
+    if previous is not None:
+        results = extend_results_frame(previous, all_races, all_sprints)
+    else:
+        results = build_results_frame(all_races, all_sprints)
+
+    with timer("index", "results"):
+        results.by_driver
+        results.cumulative
+
+    return results
 
-            fastest_lap = 0
-            rank = result.get('FastestLap', {}).get('rank')
-            fastest_lap_rank = int(rank) if rank and rank.isdigit() else None
-            if fastest_lap_rank == 1:
-                fastest_lap = 1
-
-            # Update driver stats
-            driver_points[driver_key] = driver_points.get(driver_key, 0) + points
-            driver_wins[driver_key] = driver_wins.get(driver_key, 0) + win
-            driver_podiums[driver_key] = driver_podiums.get(driver_key, 0) + podium
-            driver_top10_finishes[driver_key] = driver_top10_finishes.get(driver_key, 0) + top10
-            driver_fastest_laps[driver_key] = driver_fastest_laps.get(driver_key, 0) + fastest_lap
-
-            # Sprint data for this driver (if exists)
-            sprint_data = sprint_driver_map.get(driver_key)
-            sprint_position = None
-            sprint_points = None
-            sprint_status = None
-            sprint_date = sprint.get('date') if sprint else None
-
-            if sprint_data:
-                sprint_position = int(sprint_data.get('position', 99))
-                sprint_status = sprint_data.get('status')
-                sprint_points = float(sprint_data.get('points', 0))
-
-                # Update totals
-                driver_points[driver_key] += sprint_points
-                driver_sprint_wins[driver_key] = driver_sprint_wins.get(driver_key, 0) + (1 if sprint_position == 1 else 0)
-                driver_sprint_podiums[driver_key] = driver_sprint_podiums.get(driver_key, 0) + (1 if sprint_position <= 3 else 0)
-                driver_sprint_top8_finishes[driver_key] = driver_sprint_top8_finishes.get(driver_key, 0) + (1 if sprint_position <= 8 else 0)
-            else:
-                # Initialize if missing
-                driver_sprint_wins.setdefault(driver_key, 0)
-                driver_sprint_podiums.setdefault(driver_key, 0)
-                driver_sprint_top8_finishes.setdefault(driver_key, 0)
-
-            results_array.append({
-                "given_name": given_name,
-                "family_name": family_name,
-                "constructor_name": constructor_name,
-                "position": position,
-                "win": win,
-                "podium": podium,
-                "top10_finish": top10,
-                "points": points,
-                "status": status,
-                "fastest_lap_rank": fastest_lap_rank,
-                "season": race.get('season'),
-                "round": round_number,
-                "race_name": race_name,
-                "circuit_name": circuit_name,
-                "date": date,
-                "sprint_position": sprint_position,
-                "sprint_points": sprint_points,
-                "sprint_status": sprint_status,
-                "sprint_date": sprint_date,
-                "total_points": driver_points[driver_key], 
-                "total_wins": driver_wins[driver_key], 
-                "total_podiums": driver_podiums[driver_key], 
-                "total_top10_finishes": driver_top10_finishes[driver_key], 
-                "total_fastest_laps": driver_fastest_laps[driver_key],
-                "total_sprint_wins": driver_sprint_wins[driver_key],
-                "total_sprint_podiums": driver_sprint_podiums[driver_key],
-                "total_sprint_top8_finishes": driver_sprint_top8_finishes[driver_key]
-            })
-
-    end_time = time.time()
-    print(f"Results API time: {end_time - start_time:.2f} seconds")
-    cache[year] = results_array
-    return results_array
\ No newline at end of file
+def get_results_data(year):
+    return cache.get(year, load_results_data)
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from api.client import BASE_URL, FetchError, background
+from api.pagination import fetch_page, remaining_offsets, merge_pages, fetch_rows_after, check_complete
+from api.store import has_season, fetched_at, is_fresh, is_finished, load_season, save_season
+from api.cache import FAILURE_TTL
+from functions.metrics import timer, count
+from api.incremental import ROUND_ENDPOINTS
+
+# Loads every endpoint of a season in one concurrent wave on a single event loop and
+# writes the raw payloads to the season store, where the get_*_data functions pick them up.
+# On the interactive path only endpoints missing from the store hold up the rerun, stale ones
+# are served as stored and refreshed in the background.
+
+# endpoint: (table key, items key, per race list key)
+ENDPOINTS = {
+    "drivers": ('DriverTable', 'Drivers', None),
+    "driverstandings": ('StandingsTable', 'StandingsLists', 'DriverStandings'),
+    "results": ('RaceTable', 'Races', 'Results'),
+    "sprint": ('RaceTable', 'Races', 'SprintResults'),
+    "qualifying": ('RaceTable', 'Races', 'QualifyingResults')
+}
+
+# (endpoint, season) pairs with a background refresh in flight
+revalidating = set()
+_revalidating_lock = threading.Lock()
+
+# (endpoint, season): time of the last failed fetch, retried only after FAILURE_TTL so reruns
+# of the page do not keep hammering an API that is having trouble
+failures = {}
+
+def final_standings(standings_lists):
+    # The season endpoint returns a single list holding the latest standings
+    return standings_lists[0]['DriverStandings'] if standings_lists else []
+
+async def fetch_endpoint(year, endpoint):
+    table_key, items_key, list_key = ENDPOINTS[endpoint]
+    url = f"{BASE_URL}/{year}/{endpoint}/"
+
+    # A stale per race endpoint of the running season only needs its last round and the rows published
+    # since, a finished season stored while it ran is fetched whole (see api.incremental)
+    incremental = endpoint in ROUND_ENDPOINTS and not is_finished(year)
+    stored = load_season(endpoint, year, allow_stale=True) if incremental else None
+    if stored is not None:
+        try:
+            return await asyncio.to_thread(fetch_rows_after, url, stored, table_key, items_key, list_key)
+        except FetchError:
+            # The stored copy stays as it is, None keeps it from being saved as fresh
+            count("stale_store_fallbacks")
+            return None
+
+    # The pooled client is blocking, so each page runs on a worker thread while the loop waits on all of them
+    first_page = await asyncio.to_thread(fetch_page, url, 0)
+
+    limit, offsets = remaining_offsets(first_page)
+    pages = await asyncio.gather(*(asyncio.to_thread(fetch_page, url, offset, limit) for offset in offsets))
+
+    payload = check_complete(url, first_page, merge_pages([first_page, *pages], table_key, items_key, list_key), list_key)
+
+    if endpoint == "driverstandings":
+        payload = final_standings(payload)
+
+    return payload
+
+async def fetch_season(year, endpoints=ENDPOINTS):
+    # Only endpoints missing from the store (or stale for the running season) are fetched
+    missing = [
+        endpoint for endpoint in endpoints
+        if not has_season(endpoint, year) and time.time() - failures.get((endpoint, year), 0) > FAILURE_TTL
+    ]
+
+    payloads = await asyncio.gather(
+        *(fetch_endpoint(year, endpoint) for endpoint in missing),
+        return_exceptions=True
+    )
+
+    failed = []
+
+    for endpoint, payload in zip(missing, payloads):
+        if payload is None or isinstance(payload, FetchError):
+            # Left out of the store (or stale in it) so the view that needs it retries
+            failed.append(endpoint)
+            failures[(endpoint, year)] = time.time()
+        elif isinstance(payload, BaseException):
+            raise payload
+        else:
+            save_season(endpoint, year, payload)
+            failures.pop((endpoint, year), None)
+
+    return failed
+
+def revalidate(year, endpoints):
+    # At most one refresh per endpoint and season, at background priority
+    with _revalidating_lock:
+        endpoints = [endpoint for endpoint in endpoints if (endpoint, year) not in revalidating]
+        revalidating.update((endpoint, year) for endpoint in endpoints)
+
+    if not endpoints:
+        return
+
+    def refresh():
+        try:
+            with background():
+                asyncio.run(fetch_season(year, endpoints))
+        finally:
+            with _revalidating_lock:
+                revalidating.difference_update((endpoint, year) for endpoint in endpoints)
+
+    threading.Thread(target=refresh, name=f"season-revalidate-{year}", daemon=True).start()
+
+def load_season_data(year):
+    # Returns the endpoints that failed to load, stale ones are not waited for
+    stored_at = {endpoint: fetched_at(endpoint, year) for endpoint in ENDPOINTS}
+    stale = [
+        endpoint for endpoint, stored in stored_at.items()
+        if stored is not None and not is_fresh(year, stored)
+    ]
+
+    if stale:
+        revalidate(year, stale)
+
+    with timer("fetch", "season"):
+        return asyncio.run(fetch_season(year, [endpoint for endpoint in ENDPOINTS if endpoint not in stale]))
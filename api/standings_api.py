@@ -1,59 +1,68 @@
-import requests
-import time
-import streamlit as st
+import pandas as pd
+from api.store import load_season, save_season, is_fresh
+from api.cache import SeasonCache
+from functions.metrics import timer
+from api.pagination import fetch_all_pages
+from api.client import BASE_URL
+from api.season_loader import final_standings
+import functions.driver_index  # registers frame.by_driver
+from api import ids
 
-cache = {}
+cache = SeasonCache(is_fresh, "standings")
 
-def get_standings_data(year):
-    if year in cache:
-        return cache[year]
-    
-    start_time = time.time()
+def fetch_standings(year):
+    # API endpoint for standings {year} season
+    standings_url = f"{BASE_URL}/{year}/driverstandings/"
 
-    standings_array = []
+    standings_lists = fetch_all_pages(standings_url, 'StandingsTable', 'StandingsLists', 'DriverStandings')
 
-    # API endpoint for standings {year} season
-    standings_url = f"https://api.jolpi.ca/ergast/f1/{year}/driverstandings/"
-    
-    # Make the API request
-    standings_response = requests.get(standings_url)
-
-    # Check if the request was successful (status code 200)
-    if standings_response.status_code == 200:
-        st.write(standings_response.text)
-
-        data = standings_response.json()
-        standings = data['MRData']['StandingsTable']['StandingsLists'][0]['DriverStandings']
-
-        for standing in standings:
-            position = standing.get('position')
-            points = standing.get('points')
-            wins = standing.get('wins')
-
-            driver = standing.get('Driver', {})
-            given_name = driver.get('givenName')
-            family_name = driver.get('familyName')
-
-            constructors = standing.get('Constructors', [])
-            constructor_name = constructors[0]['name'] if constructors else None
-
-            standings_array.append({
-                "given_name": given_name,
-                "family_name": family_name,
-                "constructor_name": constructor_name,
-                "position": position,
-                "points": points,
-                "wins": wins
-            })
-        
-        st.write(standings_array)
-
-    else:
-        st.error("Failed to retrieve data. Please try again later.")
-    
-    cache[year] = standings_array
-
-    end_time = time.time()
-    print(f"Standings API time: {end_time - start_time:.2f} seconds")
-
-    return standings_array
\ No newline at end of file
+    return final_standings(standings_lists)
+
+def build_standings_frame(standings):
+    columns = {"given_name": [], "family_name": [], "driver_id": [], "constructor_id": [], "position": [], "points": [], "wins": []}
+
+    for standing in standings:
+        driver = standing.get('Driver', {})
+        given_name = driver.get('givenName')
+        family_name = driver.get('familyName')
+
+        constructors = standing.get('Constructors', [])
+        constructor = constructors[0] if constructors else ids.UNKNOWN_CONSTRUCTOR
+
+        columns["given_name"].append(given_name)
+        columns["family_name"].append(family_name)
+        columns["driver_id"].append(ids.drivers.code(driver.get('driverId'), driver))
+        columns["constructor_id"].append(ids.constructors.code(constructor.get('constructorId'), constructor))
+        columns["position"].append(standing.get('position'))
+        columns["points"].append(standing.get('points'))
+        columns["wins"].append(standing.get('wins'))
+
+    standings_frame = pd.DataFrame(columns).astype({"driver_id": "int32", "constructor_id": "int32"})
+    standings_frame.insert(3, "driver", ids.drivers.names_for(standings_frame["driver_id"]))
+    standings_frame.insert(5, "constructor_name", ids.constructors.names_for(standings_frame["constructor_id"]))
+
+    # Excluded drivers come without a classified position
+    standings_frame["position"] = pd.to_numeric(standings_frame["position"]).astype("Int16")
+    standings_frame["points"] = pd.to_numeric(standings_frame["points"]).astype("float32")
+    standings_frame["wins"] = pd.to_numeric(standings_frame["wins"]).astype("int16")
+
+    return standings_frame
+
+def load_standings_data(year):
+    with timer("fetch", "standings"):
+        standings = load_season("driverstandings", year)
+
+        if standings is None:
+            standings = fetch_standings(year)
+            save_season("driverstandings", year, standings)
+
+    with timer("parse", "standings"):
+        standings_frame = build_standings_frame(standings)
+
+    with timer("index", "standings"):
+        standings_frame.by_driver
+
+    return standings_frame
+
+def get_standings_data(year):
+    return cache.get(year, load_standings_data)
@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date
+from functions.metrics import count
+
+# Persistent season store: raw Ergast payloads kept on disk per (endpoint, season)
+# so a restart or a new replica reads locally instead of refetching from jolpi.ca.
+
+STORE_PATH = os.environ.get("F1_STORE_PATH", os.path.join("data", "f1_store.sqlite3"))
+
+# Seconds before the running season is considered stale and refetched
+CURRENT_SEASON_TTL = float(os.environ.get("F1_CURRENT_SEASON_TTL", 3600))
+
+# One connection per thread, Streamlit serves every session from its own thread
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(STORE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(STORE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS seasons ("
+            "endpoint TEXT NOT NULL, "
+            "season INTEGER NOT NULL, "
+            "payload BLOB NOT NULL, "
+            "fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (endpoint, season))"
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def use_store(path):
+    # Switch the calling thread to another store file, used by the benchmarks to start cold
+    global STORE_PATH
+    STORE_PATH = path
+
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def is_finished(year):
+    # Past seasons never change, so they are stored once and never refetched
+    return int(year) < date.today().year
+
+def is_fresh(year, fetched_at):
+    if is_finished(year):
+        # A copy taken while the season was still running misses its last rounds
+        return date.fromtimestamp(fetched_at).year > int(year)
+    return time.time() - fetched_at <= CURRENT_SEASON_TTL
+
+def fetched_at(endpoint, year):
+    # When the stored copy was fetched, None when there is none
+    row = _connect().execute(
+        "SELECT fetched_at FROM seasons WHERE endpoint = ? AND season = ?",
+        (endpoint, int(year))
+    ).fetchone()
+
+    return None if row is None else row[0]
+
+def has_season(endpoint, year):
+    stored_at = fetched_at(endpoint, year)
+    return stored_at is not None and is_fresh(year, stored_at)
+
+def load_season(endpoint, year, allow_stale=False):
+    # allow_stale hands out an outdated copy too, the running season refreshes it with only the new rows
+    row = _connect().execute(
+        "SELECT payload, fetched_at FROM seasons WHERE endpoint = ? AND season = ?",
+        (endpoint, int(year))
+    ).fetchone()
+
+    if row is None:
+        return None
+
+    payload, fetched_at = row
+    if not allow_stale and not is_fresh(year, fetched_at):
+        return None
+
+    count("store_reads")
+    count("store_bytes_read", len(payload))
+
+    return json.loads(zlib.decompress(payload))
+
+def save_season(endpoint, year, payload):
+    data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+    count("store_writes")
+    count("store_bytes_written", len(data))
+
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO seasons (endpoint, season, payload, fetched_at) VALUES (?, ?, ?, ?)",
+            (endpoint, int(year), data, time.time())
+        )
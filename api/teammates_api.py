@@ -0,0 +1,158 @@
+import time
+import pandas as pd
+from functions.metrics import timer, observe
+from api.store import load_season, save_season, is_fresh
+from api.cache import SeasonCache
+from api.results_api import get_results_data
+from api.qualifying_api import get_qualifying_data
+from api import ids
+import functions.driver_index  # registers frame.by_driver
+
+# Teammate head-to-heads of a season, one row per (driver, teammate, constructor): race finishes,
+# qualifying positions, the qualifying gap in ms and the share of the pair's points. Teammates
+# are the drivers of the same constructor in the same round, paired by a self-join of the results
+# and the qualifying frames. The table is built when a season is ingested and stored next to it
+# in the season store ("teammates"), the app only reads it back.
+
+cache = SeasonCache(is_fresh, "teammates")
+
+SESSIONS = ["q3", "q2", "q1"]
+
+TEAMMATES_DTYPES = {
+    "driver_id": "int32",
+    "teammate_id": "int32",
+    "constructor_id": "int32",
+    "driver": "category",
+    "teammate": "category",
+    "constructor_name": "category",
+    "races": "int16",
+    "race_ahead": "int16",
+    "race_behind": "int16",
+    "qualifyings": "int16",
+    "quali_ahead": "int16",
+    "quali_behind": "int16",
+    "mean_quali_gap_ms": "Float64",
+    "median_quali_gap_ms": "Float64",
+    "points": "float32",
+    "teammate_points": "float32",
+    "points_share": "Float64"
+}
+
+# Columns of the stored table besides the ids
+STORED_COLUMNS = [column for column in TEAMMATES_DTYPES if column not in ("driver_id", "teammate_id", "constructor_id", "driver", "teammate")]
+
+PAIR = ["driver_id", "teammate_id", "constructor_id"]
+
+def round_pairs(frame, columns):
+    # Every driver against every other driver of the same constructor in the same round
+    rows = frame[["round", "constructor_id", "driver_id", *columns]]
+    teammates = rows.rename(columns={"driver_id": "teammate_id", **{column: f"teammate_{column}" for column in columns}})
+
+    pairs = rows.merge(teammates, on=["round", "constructor_id"])
+
+    return pairs[pairs["driver_id"] != pairs["teammate_id"]]
+
+def build_teammates_frame(results, qualifying):
+    start_time = time.perf_counter()
+
+    race_pairs = round_pairs(
+        results.assign(race_points=results["points"].astype("float64") + results["sprint_points"].astype("float64").fillna(0)),
+        ["position", "race_points"]
+    )
+    quali_pairs = round_pairs(qualifying, ["position"] + [f"{session}_ms" for session in SESSIONS])
+
+    # Gap in the last session both drivers set a time in, negative is quicker than the teammate
+    quali_gap = pd.Series(pd.NA, index=quali_pairs.index, dtype="Int64")
+    for session in SESSIONS:
+        quali_gap = quali_gap.fillna(quali_pairs[f"{session}_ms"].astype("Int64") - quali_pairs[f"teammate_{session}_ms"].astype("Int64"))
+
+    race = race_pairs.assign(
+        ahead=race_pairs["position"] < race_pairs["teammate_position"],
+        behind=race_pairs["position"] > race_pairs["teammate_position"]
+    ).groupby(PAIR).agg(
+        races=("round", "size"),
+        race_ahead=("ahead", "sum"),
+        race_behind=("behind", "sum"),
+        points=("race_points", "sum"),
+        teammate_points=("teammate_race_points", "sum")
+    )
+
+    quali = quali_pairs.assign(
+        ahead=quali_pairs["position"] < quali_pairs["teammate_position"],
+        behind=quali_pairs["position"] > quali_pairs["teammate_position"],
+        gap=quali_gap.astype("float64")
+    ).groupby(PAIR).agg(
+        qualifyings=("round", "size"),
+        quali_ahead=("ahead", "sum"),
+        quali_behind=("behind", "sum"),
+        mean_quali_gap_ms=("gap", "mean"),
+        median_quali_gap_ms=("gap", "median")
+    )
+
+    teammates = race.join(quali, how="outer").reset_index()
+
+    pair_points = teammates["points"] + teammates["teammate_points"]
+    teammates["points_share"] = (teammates["points"] / pair_points).where(pair_points > 0)
+
+    teammates.insert(3, "driver", ids.drivers.names_for(teammates["driver_id"]))
+    teammates.insert(4, "teammate", ids.drivers.names_for(teammates["teammate_id"]))
+    teammates.insert(5, "constructor_name", ids.constructors.names_for(teammates["constructor_id"]))
+
+    teammates = teammates.fillna({"races": 0, "race_ahead": 0, "race_behind": 0, "qualifyings": 0, "quali_ahead": 0, "quali_behind": 0})
+
+    observe("derive", "teammates", time.perf_counter() - start_time)
+
+    return teammates[list(TEAMMATES_DTYPES)].astype(TEAMMATES_DTYPES)
+
+def to_payload(teammates):
+    # One list per column, the names are rebuilt from the ids when the table is read back
+    return {
+        "driver": ids.drivers.keys_for(teammates["driver_id"]).tolist(),
+        "teammate": ids.drivers.keys_for(teammates["teammate_id"]).tolist(),
+        "constructor": ids.constructors.keys_for(teammates["constructor_id"]).tolist(),
+        **{column: teammates[column].astype(object).where(teammates[column].notna(), None).tolist() for column in STORED_COLUMNS}
+    }
+
+def from_payload(payload):
+    driver_ids = [ids.drivers.code(key, {"driverId": key}) for key in payload["driver"]]
+    teammate_ids = [ids.drivers.code(key, {"driverId": key}) for key in payload["teammate"]]
+    constructor_ids = [
+        ids.constructors.code(key, {"constructorId": key, "name": name})
+        for key, name in zip(payload["constructor"], payload["constructor_name"])
+    ]
+
+    teammates = pd.DataFrame({
+        "driver_id": driver_ids,
+        "teammate_id": teammate_ids,
+        "constructor_id": constructor_ids,
+        "driver": ids.drivers.names_for(driver_ids),
+        "teammate": ids.drivers.names_for(teammate_ids),
+        **{column: payload[column] for column in STORED_COLUMNS}
+    })
+
+    return teammates.astype(TEAMMATES_DTYPES)
+
+def materialize_teammates(year, results, qualifying):
+    # Called by the ingestion with the season frames it has just built
+    teammates = build_teammates_frame(results, qualifying)
+    save_season("teammates", year, to_payload(teammates))
+
+    return teammates
+
+def load_teammates_data(year):
+    # Stored by the ingestion, a missing or outdated table is rebuilt from the season frames
+    with timer("fetch", "teammates"):
+        stored = load_season("teammates", year)
+
+    if stored is not None:
+        teammates = from_payload(stored)
+    else:
+        teammates = materialize_teammates(year, get_results_data(year), get_qualifying_data(year))
+
+    with timer("index", "teammates"):
+        teammates.by_driver
+
+    return teammates
+
+def get_teammates_data(year):
+    return cache.get(year, load_teammates_data)
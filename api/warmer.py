@@ -0,0 +1,83 @@
+import asyncio
+import os
+import threading
+from functions.metrics import timer, count
+from api.client import background, FetchError
+from api.season_loader import fetch_season
+from api.drivers_api import get_drivers_data
+from api.standings_api import get_standings_data
+from api.results_api import get_results_data
+from api.qualifying_api import get_qualifying_data
+
+# Optional background prefetch: one daemon thread per process walks the selectable seasons,
+# newest first, and fills the season store so switching years reads locally. Its requests run
+# at background priority (see api.client.background), interactive fetches always go first.
+
+# Off unless F1_WARM_SEASONS=1
+ENABLED = os.environ.get("F1_WARM_SEASONS", "0").lower() in ("1", "true", "yes")
+
+# The newest seasons also get their frames built into the in-memory caches, older ones stay in the store
+WARM_FRAMES = int(os.environ.get("F1_WARM_FRAMES", 4))
+
+progress = {"total": 0, "done": 0, "failed": [], "current": None, "finished": False}
+_progress_lock = threading.Lock()
+
+_thread = None
+_start_lock = threading.Lock()
+
+def get_progress():
+    with _progress_lock:
+        return {**progress, "failed": list(progress["failed"])}
+
+def _update(**changes):
+    with _progress_lock:
+        progress.update(changes)
+
+def warm_season(year, build_frames):
+    with background():
+        failed = asyncio.run(fetch_season(year))
+
+        if build_frames and not failed:
+            # The store is warm by now, these only parse and build the frames
+            try:
+                get_drivers_data(year)
+                get_standings_data(year)
+                get_results_data(year)
+                get_qualifying_data(year)
+            except FetchError:
+                failed = ["frames"]
+
+    return failed
+
+def warm(years):
+    seasons = sorted(years, reverse=True)
+    _update(total=len(seasons), done=0, failed=[], finished=False)
+
+    for index, year in enumerate(seasons):
+        _update(current=year)
+
+        with timer("warm", "season"):
+            failed = warm_season(year, index < WARM_FRAMES)
+
+        with _progress_lock:
+            progress["done"] += 1
+            if failed:
+                progress["failed"].append(year)
+
+        count("warm_seasons_failed" if failed else "warm_seasons")
+
+    _update(current=None, finished=True)
+
+def start_warmer(years):
+    # Safe to call on every rerun, only the first call per process starts the thread
+    global _thread
+
+    if not ENABLED:
+        return None
+
+    with _start_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm, args=(list(years),), name="season-warmer", daemon=True)
+            _thread.start()
+
+    return _thread
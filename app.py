@@ -4,10 +4,22 @@ import streamlit as st
 import pandas as pd
 import os
 import altair as alt
-from api.drivers_api import get_drivers_data
-from api.results_api import get_results_data 
-from api.standings_api import get_standings_data 
-from api.qualifying_api import get_qualifying_data 
+import time
+from api.drivers_api import get_drivers_data, build_drivers_frame
+from api.results_api import get_results_data, build_results_frame
+from api.standings_api import get_standings_data, build_standings_frame
+from api.qualifying_api import get_qualifying_data, build_qualifying_frame
+from api.laps_api import get_laps_data
+from api.pitstops_api import get_pitstops_data, build_pitstops_frame, strategy_table
+from api.teammates_api import get_teammates_data, build_teammates_frame
+from api.career import get_career_data
+from api.season_loader import load_season_data
+from api import ids
+from api.warmer import start_warmer, get_progress
+from api.client import get_stats, FetchError
+from functions.metrics import observe, snapshot
+from functions.profiling import profile_rerun
+from functions import charts
 
 st.set_page_config(layout="wide")
 
@@ -22,9 +34,61 @@ st.markdown(f"{css_content}", unsafe_allow_html=True)
 
 st.header("F1 Drivers Comparison")
 
+######### DATA #########
+
+# The api raises FetchError when a season cannot be loaded, the app reports it and shows an empty season
+def season_frame(get_data, build_empty):
+    try:
+        return get_data(st.session_state.selected_year)
+    except FetchError:
+        st.error("Failed to retrieve data. Please try again later.")
+        return build_empty()
+
+######### CHARTS #########
+
+# One tab per chart panel of a view. Switching tabs reruns the view, and only the open tab's
+# panel(metric) runs, so a view costs what the user actually looks at
+def chart_tabs(view, panel):
+    metrics = list(charts.PANELS[view])
+
+    for tab, metric in zip(st.tabs(metrics, key=f"{view}_tab", on_change="rerun"), metrics):
+        if not tab.open:
+            continue
+
+        with tab:
+            header, data, spec = panel(metric)
+            st.header(header)
+            st.vega_lite_chart(data, spec, use_container_width=True)
+
+def season_panel(view, frame, drivers):
+    return lambda metric: charts.panel(view, metric, st.session_state.selected_year, drivers, frame)
+
+######### DIAGNOSTICS #########
+
+# Hidden panel with the collected performance metrics, open the app with ?diagnostics=1
+def diagnostics():
+    if st.query_params.get("diagnostics") != "1":
+        return
+
+    metrics = snapshot()
+
+    with st.expander("Diagnostics", expanded=False):
+        st.caption(f"Client: {get_stats()}")
+        st.dataframe(pd.DataFrame.from_dict(metrics["stages"], orient="index"), use_container_width=True)
+        st.dataframe(pd.DataFrame.from_dict(metrics["endpoints"], orient="index"), use_container_width=True)
+        st.dataframe(pd.DataFrame.from_dict(metrics["caches"], orient="index"), use_container_width=True)
+        st.caption(f"Counters: {metrics['counters']}")
+
+######### PROFILING #########
+
+# Opt-in per session with ?profile=1 (or F1_PROFILE=1 for every rerun), profiles land in profiles/
+def profiling_requested():
+    return st.query_params.get("profile") == "1"
+
 ######### MAIN #########
 
 @st.fragment
+@profile_rerun("main", profiling_requested)
 def main():
 
     ######### SELECT YEAR #########
@@ -32,7 +96,17 @@ def main():
     years = [2025, 2024, 2023, 2022, 2021, 2020, 2019, 2018, 2017, 2016, 2015, 2014, 2013, 2012, 2011, 2010, 2009, 2008, 2007, 2006, 2005, 2004, 2003, 2002, 2001, 2000]
 
     st.session_state.selected_year = st.selectbox("Select a year", years)
-    st.session_state.drivers_array = get_drivers_data(st.session_state.selected_year)
+
+    # Optional (F1_WARM_SEASONS=1): preload every listed season in the background, newest first
+    if start_warmer(years):
+        warm_progress = get_progress()
+        if not warm_progress["finished"]:
+            st.caption(f"Preloading seasons in the background: {warm_progress['done']}/{warm_progress['total']}")
+
+    # Fetch every endpoint of the season in one parallel wave, the views below then read locally
+    load_season_data(st.session_state.selected_year)
+
+    st.session_state.drivers_frame = season_frame(get_drivers_data, lambda: build_drivers_frame([]))
     
     if 'view_options' not in st.session_state:
         st.session_state.view_options = "Standings" # Deault to Standings
@@ -41,18 +115,28 @@ def main():
 
     selected_drivers = st.multiselect(
         'Select drivers to compare:', 
-        [f"{driver['given_name']} {driver['family_name']}" for driver in sorted(st.session_state.drivers_array, key=lambda x: x['given_name'])],
+        st.session_state.drivers_frame.sort_values("given_name", kind="stable")["driver_id"].tolist(),
+        format_func=ids.drivers.name,
         placeholder="Choose a driver"
     )
 
     if selected_drivers:
         @st.fragment
+        @profile_rerun("views", profiling_requested)
         def views():
+            view_names = ["Standings", "Grand Prix", "Qualifying", "Teammates"]
+
+            # Sprints exist from 2021 on, Ergast has pit stop data from 2011 on
             if int(st.session_state.selected_year) > 2020:
-                st.session_state.view_options = st.radio("Select View", ["Standings", "Grand Prix", "Qualifying", "Sprints"], horizontal=True, key='view_toggle', label_visibility="collapsed")
-            
-            else:
-                st.session_state.view_options = st.radio("Select View", ["Standings", "Grand Prix", "Qualifying"], horizontal=True, key='view_toggle', label_visibility="collapsed")
+                view_names.append("Sprints")
+            if int(st.session_state.selected_year) >= 2011:
+                view_names.append("Strategy")
+            view_names.extend(["Laps", "Career"])
+
+            st.session_state.view_options = st.radio("Select View", view_names, horizontal=True, key='view_toggle', label_visibility="collapsed")
+
+            # Exactly one view branch runs per rerun, its time is recorded as that view's render stage
+            render_start = time.perf_counter()
 
             ######### Standings #########
             if st.session_state.view_options == "Standings":
@@ -61,69 +145,68 @@ def main():
 
                 with progress_container:
                     with st.status(label="Fetching Standings Data... 🔄", expanded=False, state="running") as status:
-                        st.session_state.standings_array = get_standings_data(st.session_state.selected_year)
-                        st.session_state.results_array = get_results_data(st.session_state.selected_year)
+                        st.session_state.standings_frame = season_frame(get_standings_data, lambda: build_standings_frame([]))
+                        st.session_state.results_frame = season_frame(get_results_data, lambda: build_results_frame([], []))
                     progress_container.empty()
                 
-                selected_standings_info = []
-
-                for selected in selected_drivers:
-                    selected = selected.strip() 
-                    for standings_info in st.session_state.standings_array:
-                        full_name = f"{standings_info['given_name']} {standings_info['family_name']}".strip()
-                        if selected == full_name:  
-                            position = standings_info["position"]
-                            standings_points = standings_info["points"]
-                            wins = standings_info["wins"]
-                            constructor = standings_info["constructor_name"]
-                            
-                            selected_standings_info.append({"Position": position, 
-                                                            "Driver": selected, 
-                                                            "Constructor": constructor, 
-                                                            "Points": standings_points, 
-                                                            "GP Wins": wins,
-                                                            "GP Podiums": None,
-                                                            "GP Top 10 Finishes": None, 
-                                                            "GP Fastest Laps": None,
-                                                            "Sprint Wins": None,
-                                                            "Sprint Podiums": None,
-                                                            "Sprint Top 8 Finishes": None
-                                                            })
-                            
-                for selected in selected_drivers:
-                    selected = selected.strip() 
-                    for results_info in st.session_state.results_array:
-                        full_name = f"{results_info['given_name']} {results_info['family_name']}".strip()
-                        if selected == full_name:  
-                            max_round = 0
-
-                            for round in results_info:
-                                # Check for the highest round number
-                                if int(results_info["round"]) > max_round:
-                                    max_round = int(results_info["round"])
-
-                            ## DRIVERS WHO DID NOT TAKE PART IN ROUND 24 GETS NONE!!
-                            if int(results_info["round"]) == max_round:
-                                podiums = results_info["total_podiums"]
-                                top10_finishes = results_info["total_top10_finishes"]
-                                fastest_laps = results_info["total_fastest_laps"]
-                                sprint_wins = results_info["total_sprint_wins"]
-                                sprint_podiums = results_info["total_sprint_podiums"]
-                                sprint_top8_finishes = results_info["total_sprint_top8_finishes"]
-
-                                for driver in selected_standings_info:
-                                    if driver['Driver'] == full_name:
-                                        driver["GP Podiums"] = podiums
-                                        driver["GP Top 10 Finishes"] = top10_finishes
-                                        driver["GP Fastest Laps"] = fastest_laps
-                                        driver["Sprint Wins"] = sprint_wins
-                                        driver["Sprint Podiums"] = sprint_podiums
-                                        driver["Sprint Top 8 Finishes"] = sprint_top8_finishes
-
-                selected_drivers_info_sorted = sorted(selected_standings_info, key=lambda x: int(x["Position"]))
-                df = pd.DataFrame(selected_drivers_info_sorted)
-
-                if selected_drivers_info_sorted:
+                standings = st.session_state.standings_frame
+                results = st.session_state.results_frame
+
+                # Championship state after the picked round, read off the per-driver prefix sums of the
+                # results frame, scrubbing reruns only this view and never refetches
+                rounds = results.cumulative.rounds.tolist()
+                last_round = rounds[-1] if rounds else 0
+                after_round = last_round
+
+                if len(rounds) > 1:
+                    after_round = st.select_slider("After round", rounds, value=last_round, key=f"standings_round_{st.session_state.selected_year}")
+
+                selected_standings = standings.by_driver.rows(selected_drivers)
+
+                # After the last round the official standings are shown, penalties and shared drives included
+                if after_round == last_round:
+                    championship = selected_standings
+                else:
+                    championship = results.cumulative.standings(after_round)
+                    championship = championship[championship["driver_id"].isin(selected_drivers)]
+
+                standings_data = pd.DataFrame(
+                    {
+                        "driver_id": selected_standings["driver_id"],
+                        "Driver": selected_standings["driver"].astype(str),
+                        "Constructor": selected_standings["constructor_name"]
+                    }
+                ).merge(
+                    pd.DataFrame(
+                        {
+                            "driver_id": championship["driver_id"],
+                            "Position": championship["position"],
+                            "Points": championship["points"],
+                            "GP Wins": championship["wins"]
+                        }
+                    ),
+                    on="driver_id",
+                    how="left"
+                )[["driver_id", "Position", "Driver", "Constructor", "Points", "GP Wins"]]
+
+                # Season totals after the round, drivers who missed rounds keep what they had
+                totals = results.cumulative.after(after_round, selected_drivers)
+
+                totals_data = pd.DataFrame(
+                    {
+                        "driver_id": totals["driver_id"],
+                        "GP Podiums": totals["podiums"],
+                        "GP Top 10 Finishes": totals["top10_finishes"],
+                        "GP Fastest Laps": totals["fastest_laps"],
+                        "Sprint Wins": totals["sprint_wins"],
+                        "Sprint Podiums": totals["sprint_podiums"],
+                        "Sprint Top 8 Finishes": totals["sprint_top8_finishes"]
+                    }
+                )
+
+                df = standings_data.merge(totals_data, on="driver_id", how="left").drop(columns="driver_id").sort_values("Position")
+
+                if not df.empty:
                     st.header("Standings")
                     
                     st.dataframe(df.set_index(df.columns[0]), use_container_width=True)
@@ -135,216 +218,114 @@ def main():
 
                 with progress_container:
                     with st.status(label="Fetching Grand Prix Data... 🔄", expanded=False, state="running") as status:
-                        st.session_state.results_array = get_results_data(st.session_state.selected_year)
+                        st.session_state.results_frame = season_frame(get_results_data, lambda: build_results_frame([], []))
                     progress_container.empty()
 
-                selected_results_info = []
-
-                for selected in selected_drivers:
-                    selected = selected.strip()  
-                    for results_info in st.session_state.results_array:
-                        full_name = f"{results_info['given_name']} {results_info['family_name']}".strip()
-                        if selected == full_name: 
-                            position = results_info["position"]
-                            status = results_info["status"]
-                            season = results_info["season"]
-                            round = results_info["round"]
-                            race_name = results_info["race_name"]
-                            race_points = results_info["points"]
-                            total_points = results_info["total_points"]
-                            total_wins = results_info["total_wins"]
-                            total_podiums = results_info["total_podiums"]
-                            total_top10_finishes = results_info["total_top10_finishes"]
-                            total_fastest_laps = results_info["total_fastest_laps"]
-                            circuit_name = results_info["circuit_name"]
-                            date = results_info["date"]
-                            constructor = results_info["constructor_name"]
-
-                            selected_results_info.append({"driver": selected, 
-                                                    "constructor": constructor, 
-                                                    "position": position,
-                                                    "status": status,
-                                                    "season": season,
-                                                    "round": round, 
-                                                    "race_name": race_name, 
-                                                    "race_points": race_points,
-                                                    "total_points": total_points,
-                                                    "total_wins": total_wins,
-                                                    "total_podiums": total_podiums,
-                                                    "total_top10_finishes": total_top10_finishes,
-                                                    "total_fastest_laps": total_fastest_laps,
-                                                    "circuit_name": circuit_name,
-                                                    "date": date})
-                            
-                results_round_array = []
-                results_status_array = []
-                results_driver_array = []
-                results_constructor_array = []
-                results_race_array = []
-                results_points_array = []
-                results_total_points_array = []
-                results_total_wins_array = []
-                results_total_podiums_array = []
-                results_total_top10_finishes_array = []
-                results_total_fastest_laps_array = []
-                results_array = []
-
-                for round in selected_results_info:
-                    results_round_array.append(int(round["round"]))
-
-                for status in selected_results_info:
-                    results_status_array.append(status["status"])
-
-                for driver in selected_results_info:
-                    results_driver_array.append(driver["driver"])
-
-                for constructor in selected_results_info:
-                    results_constructor_array.append(constructor["constructor"])
-
-                for race in selected_results_info:
-                    results_race_array.append(race["race_name"])
-
-                for points in selected_results_info:
-                    results_points_array.append(int(points["race_points"]))
-
-                for position in selected_results_info:
-                    results_array.append(int(position["position"]))
-
-                for total_points in selected_results_info:
-                    results_total_points_array.append(int(total_points["total_points"]))
-
-                for total_wins in selected_results_info:
-                    results_total_wins_array.append(int(total_wins["total_wins"]))
-
-                for total_podiums in selected_results_info:
-                    results_total_podiums_array.append(int(total_podiums["total_podiums"]))
-
-                for total_top10_finishes in selected_results_info:
-                    results_total_top10_finishes_array.append(int(total_top10_finishes["total_top10_finishes"]))
-
-                for total_fastest_laps in selected_results_info:
-                    results_total_fastest_laps_array.append(int(total_fastest_laps["total_fastest_laps"]))
-                
-                ######### GP Results #########
+                results = st.session_state.results_frame
 
-                st.header("GP Results")
+                ######### GP Results & Developments #########
 
-                results_data = pd.DataFrame(
-                    {
-                        "Round": results_round_array,
-                        "Position": results_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Status": results_status_array,
-                        "Grand Prix": results_race_array,
-                        "Points": results_points_array
-                    }
-                )
+                chart_tabs("grand_prix", season_panel("grand_prix", results, selected_drivers))
 
-                results_chart = alt.Chart(results_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Position').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Position', 'Points', 'Status']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+            ######### Qualifying Results #########
+            if st.session_state.view_options == "Qualifying":
+                # Create a container that can be emptied
+                progress_container = st.empty()
 
-                st.altair_chart(results_chart, use_container_width=True)
+                with progress_container:
+                    with st.status(label="Fetching Qualifying Data... 🔄", expanded=False, state="running") as status:
+                        st.session_state.qualifying_frame = season_frame(get_qualifying_data, lambda: build_qualifying_frame([]))
+                    progress_container.empty()
 
-                ######### Points Development #########
+                qualifying = st.session_state.qualifying_frame
 
-                st.header("Points Development")
+                ######### Qualifying Position & Session Gaps #########
 
-                total_points_data = pd.DataFrame(
-                    {
-                        "Round": results_round_array,
-                        "Total Points": results_total_points_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Grand Prix": results_race_array
-                    }
-                )
+                chart_tabs("qualifying", season_panel("qualifying", qualifying, selected_drivers))
 
-                total_points_chart = alt.Chart(total_points_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Total Points').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor','Total Points']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
-
-                st.altair_chart(total_points_chart, use_container_width=True)
+            ######### Teammates #########
+            if st.session_state.view_options == "Teammates":
+                # Create a container that can be emptied
+                progress_container = st.empty()
 
-                ######### Top 10 Finishes Development #########
+                with progress_container:
+                    with st.status(label="Fetching Teammates Data... 🔄", expanded=False, state="running") as status:
+                        st.session_state.teammates_frame = season_frame(
+                            get_teammates_data,
+                            lambda: build_teammates_frame(build_results_frame([], []), build_qualifying_frame([]))
+                        )
+                    progress_container.empty()
 
-                st.header("Top 10 Finishes Development")
+                teammates = st.session_state.teammates_frame
+                selected_teammates = teammates.by_driver.rows(selected_drivers)
+
+                if selected_teammates.empty:
+                    st.info("No teammate comparisons for the selected drivers this season.")
+
+                else:
+                    st.header("Teammate Head-to-Head")
+
+                    teammates_data = pd.DataFrame(
+                        {
+                            "Driver": selected_teammates["driver"].astype(str),
+                            "Teammate": selected_teammates["teammate"],
+                            "Constructor": selected_teammates["constructor_name"],
+                            "Races": selected_teammates["races"],
+                            "Races Ahead": selected_teammates["race_ahead"],
+                            "Races Behind": selected_teammates["race_behind"],
+                            "Qualifyings": selected_teammates["qualifyings"],
+                            "Qualifyings Ahead": selected_teammates["quali_ahead"],
+                            "Qualifyings Behind": selected_teammates["quali_behind"],
+                            "Median Qualifying Gap (ms)": selected_teammates["median_quali_gap_ms"].round(0),
+                            "Mean Qualifying Gap (ms)": selected_teammates["mean_quali_gap_ms"].round(0),
+                            "Points": selected_teammates["points"],
+                            "Teammate Points": selected_teammates["teammate_points"],
+                            "Points Share (%)": (selected_teammates["points_share"] * 100).round(1)
+                        }
+                    )
+
+                    st.dataframe(teammates_data.set_index("Driver"), use_container_width=True)
 
-                total_top10_finishes_data = pd.DataFrame(
-                    {
-                        "Round": results_round_array,
-                        "Total Top 10 Finishes": results_total_top10_finishes_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Grand Prix": results_race_array
-                    }
-                )
+            ######### Sprint #########
+            if st.session_state.view_options == "Sprints":
+                # Create a container that can be emptied
+                progress_container = st.empty()
 
-                total_top10_finishes_chart = alt.Chart(total_top10_finishes_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Total Top 10 Finishes').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor','Total Top 10 Finishes']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+                with progress_container:
+                    with st.status(label="Fetching Sprints Data... 🔄", expanded=False, state="running") as status:
+                        st.session_state.results_frame = season_frame(get_results_data, lambda: build_results_frame([], []))
+                    progress_container.empty()
 
-                st.altair_chart(total_top10_finishes_chart, use_container_width=True)
+                results = st.session_state.results_frame
 
-                ######### Podiums Development #########
+                # Only sprint weekends the driver actually took part in
+                selected_results = results.by_driver.rows(selected_drivers)
+                selected_sprints = selected_results[
+                    selected_results["sprint_date"].notna()
+                    & selected_results["sprint_status"].notna()
+                ]
 
-                st.header("Podiums Development")
+                st.header("Sprint Results")
 
-                total_podiums_data = pd.DataFrame(
+                sprint_results_data = pd.DataFrame(
                     {
-                        "Round": results_round_array,
-                        "Total Podiums": results_total_podiums_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Grand Prix": results_race_array
+                        "Round": selected_sprints["round"],
+                        "Position": selected_sprints["sprint_position"],
+                        "Driver": selected_sprints["driver"],
+                        "Constructor": selected_sprints["constructor_name"],
+                        "Status": selected_sprints["sprint_status"],
+                        "Grand Prix": selected_sprints["race_name"],
+                        "Points": selected_sprints["sprint_points"]
                     }
                 )
 
-                total_podiums_chart = alt.Chart(total_podiums_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Total Podiums').scale(zero=False),
+                unique_rounds = sorted(sprint_results_data['Round'].unique())
+
+                sprint_results_chart = alt.Chart(sprint_results_data).mark_line(size=5).encode(
+                    alt.X('Round', sort='ascending',axis=alt.Axis(values=unique_rounds)).scale(zero=False),
+                    alt.Y('Position').scale(zero=False),
                     color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor','Total Podiums']
+                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Position', 'Points', 'Status']
                 ).interactive(
                 ).properties(
                     height=600
@@ -352,448 +333,151 @@ def main():
                     background='#ffffff'
                 ).configure_axis(
                     labelFontSize=16,
-                    titleFontSize=18 
+                    titleFontSize=18,
+                    labelAngle=0
                 ).configure_title(
                     fontSize=20  
                 )
 
-                st.altair_chart(total_podiums_chart, use_container_width=True)
-
-                ######### Wins Development #########
+                st.altair_chart(sprint_results_chart, use_container_width=True)
 
-                st.header("Wins Development")
+            ######### Strategy #########
+            if st.session_state.view_options == "Strategy":
+                # Create a container that can be emptied
+                progress_container = st.empty()
 
-                total_wins_data = pd.DataFrame(
-                    {
-                        "Round": results_round_array,
-                        "Total Wins": results_total_wins_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Grand Prix": results_race_array
-                    }
-                )
+                with progress_container:
+                    with st.status(label="Fetching Pit Stop Data... 🔄", expanded=False, state="running") as status:
+                        st.session_state.pitstops_frame = season_frame(get_pitstops_data, lambda: build_pitstops_frame({}))
+                    progress_container.empty()
 
-                total_wins_chart = alt.Chart(total_wins_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Total Wins').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor','Total Wins']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+                pitstops = st.session_state.pitstops_frame
+                selected_pitstops = pitstops.by_driver.rows(selected_drivers)
 
-                st.altair_chart(total_wins_chart, use_container_width=True)
+                if selected_pitstops.empty:
+                    st.info("No pit stops recorded for the selected drivers this season.")
 
-                ######### Fastest Laps Development #########
+                else:
+                    st.header("Pit Stops")
 
-                st.header("Fastest Laps Development")
+                    strategy = strategy_table(selected_pitstops)
 
-                total_fastest_laps_data = pd.DataFrame(
-                    {
-                        "Round": results_round_array,
-                        "Total Fastest Laps": results_total_fastest_laps_array,
-                        "Driver": results_driver_array,
-                        "Constructor": results_constructor_array,
-                        "Grand Prix": results_race_array
-                    }
-                )
+                    strategy_data = pd.DataFrame(
+                        {
+                            "Driver": strategy["driver"].astype(str),
+                            "Races": strategy["races"],
+                            "Stops": strategy["stops"],
+                            "Stops per Race": strategy["stops_per_race"].round(2),
+                            "Mean Stop (sec)": strategy["mean_duration"].round(3),
+                            "Fastest Stop (sec)": strategy["fastest_duration"].round(3),
+                            "Mean Difference to Median (sec)": strategy["mean_delta"].round(3)
+                        }
+                    )
 
-                total_fastest_laps_chart = alt.Chart(total_fastest_laps_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Total Fastest Laps').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor','Total Fastest Laps']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+                    st.dataframe(strategy_data.set_index("Driver"), use_container_width=True)
 
-                st.altair_chart(total_fastest_laps_chart, use_container_width=True)
+                    chart_tabs("strategy", season_panel("strategy", pitstops, selected_drivers))
 
-            ######### Qualifying Results #########
-            if st.session_state.view_options == "Qualifying":
+            ######### Laps #########
+            if st.session_state.view_options == "Laps":
                 # Create a container that can be emptied
                 progress_container = st.empty()
 
                 with progress_container:
-                    with st.status(label="Fetching Qualifying Data... 🔄", expanded=False, state="running") as status:
-                        st.session_state.qualifying_array = get_qualifying_data(st.session_state.selected_year)
+                    with st.status(label="Fetching Grand Prix Data... 🔄", expanded=False, state="running") as status:
+                        st.session_state.results_frame = season_frame(get_results_data, lambda: build_results_frame([], []))
                     progress_container.empty()
 
-                selected_qualifying_info = []
-
-                for selected in selected_drivers:
-                    selected = selected.strip()  
-                    for qualifying_info in st.session_state.qualifying_array:
-                        full_name = f"{qualifying_info['given_name']} {qualifying_info['family_name']}".strip()
-                        if selected == full_name: 
-                            position = qualifying_info["position"]
-                            q1 = qualifying_info["q1"]
-                            q1_sec = qualifying_info["q1_sec"]
-                            fastest_q1_time = qualifying_info["fastest_q1_time"]
-                            difference_fastest_q1_time = qualifying_info["difference_fastest_q1_time"]
-                            q2 = qualifying_info["q2"]
-                            q2_sec = qualifying_info["q2_sec"]
-                            fastest_q2_time = qualifying_info["fastest_q2_time"]
-                            difference_fastest_q2_time = qualifying_info["difference_fastest_q2_time"]
-                            q3 = qualifying_info["q3"]
-                            q3_sec = qualifying_info["q3_sec"]
-                            fastest_q3_time = qualifying_info["fastest_q3_time"]
-                            difference_fastest_q3_time = qualifying_info["difference_fastest_q3_time"]
-                            season = qualifying_info["season"]
-                            round = qualifying_info["round"]
-                            race_name = qualifying_info["race_name"]
-                            circuit_name = qualifying_info["circuit_name"]
-                            date = qualifying_info["date"]
-                            constructor = qualifying_info["constructor_name"]
-
-                            selected_qualifying_info.append({"driver": selected, 
-                                                    "constructor": constructor, 
-                                                    "position": position,
-                                                    "q1": q1, 
-                                                    "q1_sec": q1_sec,
-                                                    "fastest_q1_time": fastest_q1_time,
-                                                    "difference_fastest_q1_time": difference_fastest_q1_time,
-                                                    "q2": q2,
-                                                    "q2_sec": q2_sec,
-                                                    "fastest_q2_time": fastest_q2_time,
-                                                    "difference_fastest_q2_time": difference_fastest_q2_time,
-                                                    "q3": q3, 
-                                                    "q3_sec": q3_sec,
-                                                    "fastest_q3_time": fastest_q3_time,
-                                                    "difference_fastest_q3_time": difference_fastest_q3_time,
-                                                    "season": season,
-                                                    "round": round, 
-                                                    "race_name": race_name, 
-                                                    "circuit_name": circuit_name,
-                                                    "date": date})
-                qualifying_round_array = []
-                q1_lap_time_array = []
-                fastest_q1_time_array = []
-                difference_fastest_q1_time_array = []
-                q2_lap_time_array = []
-                fastest_q2_time_array = []
-                difference_fastest_q2_time_array = []
-                q3_lap_time_array = []
-                fastest_q3_time_array = []
-                difference_fastest_q3_time_array = []
-                qualifying_driver_array = []
-                qualifying_constructor_array = []
-                qualifying_race_array = []
-                qualiying_array = []
-
-                for round in selected_qualifying_info:
-                    qualifying_round_array.append(int(round["round"]))
-
-                for q1_lap_time in selected_qualifying_info:
-                    q1_lap_time_array.append(q1_lap_time["q1"])
-
-                for q1_fastest in selected_qualifying_info:
-                    fastest_q1_time_array.append(q1_fastest["fastest_q1_time"])
-
-                for q1_difference in selected_qualifying_info:
-                    difference_fastest_q1_time_array.append(q1_difference["difference_fastest_q1_time"])
-
-                for q2_lap_time in selected_qualifying_info:
-                    q2_lap_time_array.append(q2_lap_time["q2"])
-
-                for q2_fastest in selected_qualifying_info:
-                    fastest_q2_time_array.append(q2_fastest["fastest_q2_time"])
-
-                for q2_difference in selected_qualifying_info:
-                    difference_fastest_q2_time_array.append(q2_difference["difference_fastest_q2_time"])
-
-                for q3_lap_time in selected_qualifying_info:
-                    q3_lap_time_array.append(q3_lap_time["q3"])
-
-                for q3_fastest in selected_qualifying_info:
-                    fastest_q3_time_array.append(q3_fastest["fastest_q3_time"])
-
-                for q3_difference in selected_qualifying_info:
-                    difference_fastest_q3_time_array.append(q3_difference["difference_fastest_q3_time"])
-
-                for driver in selected_qualifying_info:
-                    qualifying_driver_array.append(driver["driver"])
-
-                for constructor in selected_qualifying_info:
-                    qualifying_constructor_array.append(constructor["constructor"])
-
-                for race in selected_qualifying_info:
-                    qualifying_race_array.append(race["race_name"])
-
-                for position in selected_qualifying_info:
-                    qualiying_array.append(int(position["position"]))
-
-                st.header("Qualifying Position")
-
-                qualifying_data = pd.DataFrame(
-                    {
-                        "Round": qualifying_round_array,
-                        "Position": qualiying_array,
-                        "Driver": qualifying_driver_array,
-                        "Constructor": qualifying_constructor_array,
-                        "Grand Prix": qualifying_race_array
-                    }
-                )
-
-                qualifying_chart = alt.Chart(qualifying_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Position').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Position']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+                # Only races that have been run can have lap timings
+                rounds = st.session_state.results_frame.drop_duplicates("round")
+                race_names = dict(zip(rounds["round"].tolist(), rounds["race_name"].astype(str)))
 
-                st.altair_chart(qualifying_chart, use_container_width=True)
+                selected_round = st.selectbox("Select a Grand Prix", list(race_names), format_func=race_names.get, key="laps_round")
 
-                ######### Q1 #########
+                race_laps = None
 
-                st.header("Difference to fastest Q1 lap time")
+                if selected_round is not None:
+                    with progress_container:
+                        with st.status(label="Fetching Lap Times... 🔄", expanded=False, state="running") as status:
+                            try:
+                                race_laps = get_laps_data(st.session_state.selected_year, selected_round)
+                            except FetchError:
+                                race_laps = None
+                        progress_container.empty()
 
-                q1_data = pd.DataFrame(
-                    {
-                        "Round": qualifying_round_array,
-                        "Difference (sec)": difference_fastest_q1_time_array,
-                        "Driver": qualifying_driver_array,
-                        "Constructor": qualifying_constructor_array,
-                        "Q1 Lap Time": q1_lap_time_array,
-                        "Fastest Q1 Lap Time": fastest_q1_time_array,
-                        "Grand Prix": qualifying_race_array
-                    }
-                )
+                    if race_laps is None:
+                        st.error("No lap times available for this Grand Prix. Please try again later.")
 
-                q1_chart = alt.Chart(q1_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Difference (sec)').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Q1 Lap Time', "Fastest Q1 Lap Time", "Difference (sec)"]
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
+                if race_laps is not None and race_laps.laps > 1:
+                    first_lap, last_lap = st.slider("Laps", 1, race_laps.laps, (1, race_laps.laps), key="laps_range")
 
-                st.altair_chart(q1_chart, use_container_width=True)
+                    lap_frame = race_laps.slice(selected_drivers, first_lap, last_lap)
 
-                ######### Q2 #########
+                    chart_tabs("laps", lambda metric: charts.frame_panel("laps", metric, lap_frame))
 
-                st.header("Difference to fastest Q2 lap time")
+            ######### Career #########
+            if st.session_state.view_options == "Career":
+                # The ten seasons up to the selected one unless another range is picked
+                selected_year = int(st.session_state.selected_year)
 
-                q2_data = pd.DataFrame(
-                    {
-                        "Round": qualifying_round_array,
-                        "Difference (sec)": difference_fastest_q2_time_array,
-                        "Driver": qualifying_driver_array,
-                        "Constructor": qualifying_constructor_array,
-                        "Q2 Lap Time": q2_lap_time_array,
-                        "Fastest Q2 Lap Time": fastest_q2_time_array,
-                        "Grand Prix": qualifying_race_array
-                    }
+                first_season, last_season = st.select_slider(
+                    "Seasons",
+                    sorted(years),
+                    value=(max(min(years), selected_year - 9), selected_year),
+                    key="career_seasons"
                 )
 
-                q2_chart = alt.Chart(q2_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Difference (sec)').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Q2 Lap Time', "Fastest Q2 Lap Time",  "Difference (sec)"]
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
-
-                st.altair_chart(q2_chart, use_container_width=True)
-
-                ######### Q3 #########
-
-                st.header("Difference to fastest Q3 lap time")
-
-                q3_data = pd.DataFrame(
-                    {
-                        "Round": qualifying_round_array,
-                        "Difference (sec)": difference_fastest_q3_time_array,
-                        "Driver": qualifying_driver_array,
-                        "Constructor": qualifying_constructor_array,
-                        "Q3 Lap Time": q3_lap_time_array,
-                        "Fastest Q3 Lap Time": fastest_q3_time_array,
-                        "Grand Prix": qualifying_race_array
-                    }
-                )
-
-                q3_chart = alt.Chart(q3_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending').scale(zero=False),
-                    alt.Y('Difference (sec)').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Q3 Lap Time', "Fastest Q3 Lap Time", "Difference (sec)"]
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18 
-                ).configure_title(
-                    fontSize=20  
-                )
-
-                st.altair_chart(q3_chart, use_container_width=True)
-
-            ######### Sprint #########
-            if st.session_state.view_options == "Sprints":
                 # Create a container that can be emptied
                 progress_container = st.empty()
 
                 with progress_container:
-                    with st.status(label="Fetching Sprints Data... 🔄", expanded=False, state="running") as status:
-                        st.session_state.results_array = get_results_data(st.session_state.selected_year)
+                    with st.status(label="Fetching Career Data... 🔄", expanded=False, state="running") as status:
+                        career = get_career_data(range(first_season, last_season + 1), selected_drivers)
                     progress_container.empty()
 
-                selected_sprint_info = []
-
-                for selected in selected_drivers:
-                    selected = selected.strip()  
-                    for results_info in st.session_state.results_array:
-                        if results_info["sprint_date"]:
-                            full_name = f"{results_info['given_name']} {results_info['family_name']}".strip()
-                            if selected == full_name: 
-                                if results_info["sprint_status"]:
-                                    position = results_info["position"]
-                                    status = results_info["status"]
-                                    season = results_info["season"]
-                                    round = results_info["round"]
-                                    race_name = results_info["race_name"]
-                                    race_points = results_info["points"]
-                                    total_points = results_info["total_points"]
-                                    circuit_name = results_info["circuit_name"]
-                                    date = results_info["date"]
-                                    constructor = results_info["constructor_name"]
-                                    sprint_position = results_info["sprint_position"]
-                                    sprint_points = results_info["sprint_points"]
-                                    sprint_status = results_info["sprint_status"]
-                                    sprint_date = results_info["sprint_date"]
-
-                                    selected_sprint_info.append({"driver": selected, 
-                                                            "constructor": constructor, 
-                                                            "position": position,
-                                                            "status": status,
-                                                            "season": season,
-                                                            "round": round, 
-                                                            "race_name": race_name, 
-                                                            "race_points": race_points,
-                                                            "total_points": total_points,
-                                                            "circuit_name": circuit_name,
-                                                            "date": date,
-                                                            "sprint_position": sprint_position,
-                                                            "sprint_points": sprint_points,
-                                                            "sprint_status": sprint_status,
-                                                            "sprint_date": sprint_date}
-                                                            )
-                                                            
-                sprint_results_round_array = []
-                sprint_results_status_array = []
-                sprint_results_driver_array = []
-                sprint_results_constructor_array = []
-                sprint_results_race_array = []
-                sprint_results_points_array = []
-                sprint_results_array = []
-
-                for sprint_round in selected_sprint_info:
-                    sprint_results_round_array.append(int(sprint_round["round"]))
-
-                for sprint_status in selected_sprint_info:
-                    sprint_results_status_array.append(sprint_status["sprint_status"])
-
-                for driver in selected_sprint_info:
-                    sprint_results_driver_array.append(driver["driver"])
-
-                for constructor in selected_sprint_info:
-                    sprint_results_constructor_array.append(constructor["constructor"])
-
-                for sprint_race in selected_sprint_info:
-                    sprint_results_race_array.append(sprint_race["race_name"])
-                
-                for sprint_points in selected_sprint_info:
-                    sprint_results_points_array.append(int(sprint_points["sprint_points"]))
+                if career["failed"]:
+                    st.error(f"Failed to retrieve {', '.join(map(str, career['failed']))}, these seasons are left out.")
 
-                for sprint_position in selected_sprint_info:
-                    if sprint_position["sprint_position"] is not None:
-                        sprint_results_array.append(int(sprint_position["sprint_position"]))
-                    else:
-                        sprint_results_array.append(None)
+                career_table = career["table"]
 
-                st.header("Sprint Results")
+                if career_table.empty:
+                    st.info("No results recorded for the selected drivers in these seasons.")
 
-                sprint_results_data = pd.DataFrame(
-                    {
-                        "Round": sprint_results_round_array,
-                        "Position": sprint_results_array,
-                        "Driver": sprint_results_driver_array,
-                        "Constructor": sprint_results_constructor_array,
-                        "Status": sprint_results_status_array,
-                        "Grand Prix": sprint_results_race_array,
-                        "Points": sprint_results_points_array
-                    }
-                )
+                else:
+                    st.header("Career")
 
-                unique_rounds = sorted(sprint_results_data['Round'].unique())
+                    career_data = pd.DataFrame(
+                        {
+                            "Driver": career_table["driver"],
+                            "Seasons": career_table["seasons"],
+                            "First Season": career_table["first_season"],
+                            "Last Season": career_table["last_season"],
+                            "Starts": career_table["starts"],
+                            "Points": career_table["points"],
+                            "Points per Start": career_table["points_per_start"].round(2),
+                            "Wins": career_table["wins"],
+                            "Podiums": career_table["podiums"],
+                            "Top 10 Finishes": career_table["top10_finishes"],
+                            "Fastest Laps": career_table["fastest_laps"],
+                            "Poles": career_table["poles"],
+                            "Mean Qualifying Position": career_table["mean_qualifying"].round(2),
+                            "Best Finish": career_table["best_finish"],
+                            "Best Championship Position": career_table["best_championship"],
+                            "Titles": career_table["titles"]
+                        }
+                    )
 
-                sprint_results_chart = alt.Chart(sprint_results_data).mark_line(size=5).encode(
-                    alt.X('Round', sort='ascending',axis=alt.Axis(values=unique_rounds)).scale(zero=False),
-                    alt.Y('Position').scale(zero=False),
-                    color='Driver',
-                    tooltip=['Round', 'Grand Prix', 'Driver', 'Constructor', 'Position', 'Points', 'Status']
-                ).interactive(
-                ).properties(
-                    height=600
-                ).configure(
-                    background='#ffffff'
-                ).configure_axis(
-                    labelFontSize=16,
-                    titleFontSize=18,
-                    labelAngle=0
-                ).configure_title(
-                    fontSize=20  
-                )
+                    st.dataframe(career_data.set_index("Driver"), use_container_width=True)
 
-                st.altair_chart(sprint_results_chart, use_container_width=True)
+                    chart_tabs("career", lambda metric: charts.frame_panel("career", metric, career["seasons"] if metric == "Championship" else career["curves"]))
+
+            observe("render", st.session_state.view_options, time.perf_counter() - render_start)
+
+            diagnostics()
 
         views()
 
+    else:
+        diagnostics()
+
 main()
\ No newline at end of file
@@ -0,0 +1 @@
+# Marks the repository root for pytest, so the tests import api, functions and tools with a bare `pytest`
@@ -0,0 +1,197 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+import altair as alt
+import pandas as pd
+from functions.metrics import register_cache
+
+# Chart panels of the views. A view shows one panel at a time (the open tab), so only that
+# panel's frame is derived and only its rows go to the browser. The frames are cached per
+# (view, season, drivers, metric) and rebuilt once the season frame behind them has been
+# replaced, the specs carry no data and are built once per panel.
+
+# Cached panel frames, least recently used ones are dropped first
+MAX_ENTRIES = int(os.environ.get("F1_CHART_CACHE", 64))
+
+# Fields every panel shows: (column in the chart, column of the season frame, Vega-Lite type),
+# the first one is the x axis
+COMMON = [
+    ("Round", "round", "quantitative"),
+    ("Grand Prix", "race_name", "nominal"),
+    ("Driver", "driver", "nominal"),
+    ("Constructor", "constructor_name", "nominal")
+]
+
+def development(column, frame_column):
+    return COMMON + [(column, frame_column, "quantitative")]
+
+def session_gap(session):
+    return COMMON + [
+        (f"{session.upper()} Lap Time", session, "nominal"),
+        (f"Fastest {session.upper()} Lap Time", f"fastest_{session}_time", "nominal"),
+        ("Difference (sec)", f"difference_fastest_{session}_time", "quantitative")
+    ]
+
+PIT_STOP = [
+    ("Round", "round", "quantitative"),
+    ("Grand Prix", "race_name", "nominal"),
+    ("Driver", "driver", "nominal"),
+    ("Stop", "stop", "quantitative"),
+    ("Lap", "lap", "quantitative"),
+    ("Duration (sec)", "duration", "quantitative")
+]
+
+# Career curves run over every race of the range, in career order
+CAREER = [
+    ("Career Race", "career_race", "quantitative"),
+    ("Season", "season", "quantitative"),
+    ("Grand Prix", "race_name", "nominal"),
+    ("Driver", "driver", "nominal"),
+    ("Constructor", "constructor_name", "nominal")
+]
+
+# view -> tab label -> (header, y field, fields), tabs in display order
+PANELS = {
+    "grand_prix": {
+        "Results": ("GP Results", "Position", COMMON + [
+            ("Position", "position", "quantitative"),
+            ("Points", "points", "quantitative"),
+            ("Status", "status", "nominal")
+        ]),
+        "Points": ("Points Development", "Total Points", development("Total Points", "total_points")),
+        "Top 10 Finishes": ("Top 10 Finishes Development", "Total Top 10 Finishes", development("Total Top 10 Finishes", "total_top10_finishes")),
+        "Podiums": ("Podiums Development", "Total Podiums", development("Total Podiums", "total_podiums")),
+        "Wins": ("Wins Development", "Total Wins", development("Total Wins", "total_wins")),
+        "Fastest Laps": ("Fastest Laps Development", "Total Fastest Laps", development("Total Fastest Laps", "total_fastest_laps"))
+    },
+    "qualifying": {
+        "Position": ("Qualifying Position", "Position", COMMON + [("Position", "position", "quantitative")]),
+        "Q1": ("Difference to fastest Q1 lap time", "Difference (sec)", session_gap("q1")),
+        "Q2": ("Difference to fastest Q2 lap time", "Difference (sec)", session_gap("q2")),
+        "Q3": ("Difference to fastest Q3 lap time", "Difference (sec)", session_gap("q3"))
+    },
+    "laps": {
+        "Lap Times": ("Lap Times", "Lap Time (sec)", [
+            ("Lap", "lap", "quantitative"),
+            ("Driver", "driver", "nominal"),
+            ("Lap Time (sec)", "lap_time", "quantitative"),
+            ("Position", "position", "quantitative")
+        ]),
+        "Positions": ("Positions", "Position", [
+            ("Lap", "lap", "quantitative"),
+            ("Driver", "driver", "nominal"),
+            ("Position", "position", "quantitative"),
+            ("Lap Time (sec)", "lap_time", "quantitative")
+        ])
+    },
+    "strategy": {
+        "Stop Laps": ("Stop Laps", "Lap", PIT_STOP),
+        "Stop Times": ("Difference to the median stop of the race", "Difference (sec)", PIT_STOP + [("Difference (sec)", "delta_to_median", "quantitative")])
+    },
+    "career": {
+        "Points": ("Career Points", "Total Points", CAREER + [("Total Points", "total_points", "quantitative")]),
+        "Wins": ("Career Wins", "Total Wins", CAREER + [("Total Wins", "total_wins", "quantitative")]),
+        "Podiums": ("Career Podiums", "Total Podiums", CAREER + [("Total Podiums", "total_podiums", "quantitative")]),
+        "Championship": ("Championship Positions", "Position", [
+            ("Season", "season", "quantitative"),
+            ("Driver", "driver", "nominal"),
+            ("Position", "position", "quantitative"),
+            ("Points", "points", "quantitative"),
+            ("Wins", "wins", "quantitative")
+        ])
+    }
+}
+
+# Panels drawn as points, a race with several stops is no line
+POINT_PANELS = {("strategy", "Stop Laps"), ("strategy", "Stop Times")}
+
+@functools.lru_cache(maxsize=None)
+def panel_spec(view, metric):
+    _, y, fields = PANELS[view][metric]
+
+    chart = alt.Chart()
+    chart = chart.mark_point(size=120, filled=True) if (view, metric) in POINT_PANELS else chart.mark_line(size=5)
+
+    spec = chart.encode(
+        alt.X(f"{fields[0][0]}:Q", sort='ascending').scale(zero=False),
+        alt.Y(f"{y}:Q").scale(zero=False),
+        color='Driver:N',
+        tooltip=[alt.Tooltip(field=column, type=kind) for column, _, kind in fields]
+    ).interactive(
+    ).properties(
+        height=600
+    ).configure(
+        background='#ffffff'
+    ).configure_axis(
+        labelFontSize=16,
+        titleFontSize=18
+    ).configure_title(
+        fontSize=20
+    ).to_dict(validate=False)
+
+    # Altair gives a data-less chart a placeholder dataset, the rows are passed alongside instead
+    spec.pop("data", None)
+    spec.pop("datasets", None)
+
+    return spec
+
+def panel_frame(selected, fields):
+    return pd.DataFrame({column: selected[frame_column] for column, frame_column, _ in fields})
+
+class ChartCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, source, build):
+        # source is the season frame the value is built from, a refreshed season is a new frame
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+
+            self.stats["misses"] += 1
+
+        value = build()
+
+        with self._lock:
+            self._entries[key] = (source, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+        return value
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+cache = ChartCache()
+register_cache("charts", cache)
+
+def panel(view, metric, season, drivers, source):
+    # Header, rows and spec of one panel. drivers are driver_id codes, source the season frame
+    header, _, fields = PANELS[view][metric]
+
+    data = cache.get(
+        (view, season, frozenset(drivers), metric),
+        source,
+        lambda: panel_frame(source.by_driver.rows(drivers), fields)
+    )
+
+    return header, data, panel_spec(view, metric)
+
+def frame_panel(view, metric, frame):
+    # Panels of frames that are already cut down to the selection (a lap range, a career),
+    # cheap enough to take on every rerun
+    header, _, fields = PANELS[view][metric]
+
+    return header, panel_frame(frame, fields), panel_spec(view, metric)
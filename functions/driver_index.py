@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+# Per-driver row index over a season frame, available on every frame as frame.by_driver.
+# pandas caches the accessor on the frame object, so the index is built once per season frame
+# (the api caches hand out the same frame on every rerun) and views become direct lookups.
+# The load_*_data functions touch it before the frame goes into a cache, timed as "index".
+
+@pd.api.extensions.register_dataframe_accessor("by_driver")
+class DriverIndex:
+    def __init__(self, frame):
+        self._frame = frame
+
+        # driver_id code -> positions of that driver's rows, in frame order
+        self.positions = {
+            int(driver): positions
+            for driver, positions in frame.groupby("driver_id").indices.items()
+        }
+
+    def rows(self, drivers):
+        # All rows of the given drivers, same order as the full frame
+        found = [self.positions[driver] for driver in drivers if driver in self.positions]
+
+        if not found:
+            return self._frame.iloc[:0]
+
+        return self._frame.take(np.sort(np.concatenate(found)))
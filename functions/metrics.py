@@ -0,0 +1,131 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Process wide performance metrics: stage timers (get, fetch, parse, derive, render), per endpoint
+# request counts, latency histograms and bytes, plain counters and the hit ratios of the caches.
+# Set F1_METRICS_FILE to also append every observation as a JSON line, the app shows the
+# aggregated numbers in a hidden panel (?diagnostics=1).
+
+METRICS_FILE = os.environ.get("F1_METRICS_FILE")
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket takes everything above
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, milliseconds):
+        self.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def quantile(self, share):
+        # Upper bound of the bucket holding the quantile, never more than the largest sample
+        rank = share * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return min(self.max, BUCKETS_MS[index]) if index < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": self.max
+        }
+
+_lock = threading.Lock()
+_stages = {}
+_endpoints = {}
+_counters = {}
+_caches = {}
+_file = None
+
+def _emit(event):
+    # Caller holds _lock
+    global _file
+
+    if not METRICS_FILE:
+        return
+
+    if _file is None:
+        directory = os.path.dirname(METRICS_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _file = open(METRICS_FILE, "a", buffering=1, encoding="utf-8")
+
+    _file.write(json.dumps({"time": time.time(), **event}, separators=(",", ":")) + "\n")
+
+def observe(stage, name, seconds):
+    milliseconds = seconds * 1000
+
+    with _lock:
+        _stages.setdefault((stage, name), Histogram()).observe(milliseconds)
+        _emit({"kind": "stage", "stage": stage, "name": name, "ms": round(milliseconds, 3)})
+
+@contextmanager
+def timer(stage, name):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, name, time.perf_counter() - start_time)
+
+def record_request(endpoint, seconds, nbytes, status):
+    milliseconds = seconds * 1000
+
+    with _lock:
+        entry = _endpoints.get(endpoint)
+        if entry is None:
+            entry = _endpoints[endpoint] = {"latency": Histogram(), "bytes": 0, "errors": 0}
+
+        entry["latency"].observe(milliseconds)
+        entry["bytes"] += nbytes
+        if status != 200:
+            entry["errors"] += 1
+
+        _emit({"kind": "request", "endpoint": endpoint, "ms": round(milliseconds, 3), "bytes": nbytes, "status": status})
+
+def count(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def register_cache(name, cache):
+    # cache is anything with get_stats() returning hit and miss counters, read on every snapshot
+    with _lock:
+        _caches[name] = cache
+
+def cache_stats(stats):
+    served = stats.get("hits", 0) + stats.get("stale_hits", 0) + stats.get("coalesced", 0)
+    lookups = served + stats.get("misses", 0) + stats.get("failure_hits", 0)
+    return {**stats, "hit_ratio": served / lookups if lookups else 0.0}
+
+def snapshot():
+    with _lock:
+        stages = {f"{stage}:{name}": histogram.as_dict() for (stage, name), histogram in _stages.items()}
+        endpoints = {
+            endpoint: {**entry["latency"].as_dict(), "bytes": entry["bytes"], "errors": entry["errors"]}
+            for endpoint, entry in _endpoints.items()
+        }
+        counters = dict(_counters)
+        caches = dict(_caches)
+
+    return {
+        "stages": stages,
+        "endpoints": endpoints,
+        "counters": counters,
+        "caches": {name: cache_stats(cache.get_stats()) for name, cache in caches.items()}
+    }
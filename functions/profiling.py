@@ -0,0 +1,148 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Opt-in profiling of Streamlit reruns. A decorated fragment runs under cProfile while a sampler
+# thread records its stack every few milliseconds. Each rerun leaves three files in PROFILE_DIR:
+#   <stamp>-<name>.prof       deterministic profile, open with snakeviz or pstats
+#   <stamp>-<name>.collapsed  sampled stacks, one "frame;frame;frame count" line each, for flamegraph.pl or speedscope
+#   <stamp>-<name>.json       sampled time attributed to the api calls, DataFrame builds and charts of the app
+
+# Profile every rerun, otherwise only the ones the app asks for (?profile=1)
+ENABLED = os.environ.get("F1_PROFILE", "0").lower() in ("1", "true", "yes")
+
+PROFILE_DIR = os.environ.get("F1_PROFILE_DIR", "profiles")
+
+# Seconds between two stack samples
+SAMPLE_INTERVAL = float(os.environ.get("F1_PROFILE_INTERVAL", 0.005))
+
+API_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api") + os.sep
+FUNCTIONS_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+CHARTS_FILE = os.path.join(FUNCTIONS_DIR, "charts.py")
+
+# A rerun of main() also runs views(), only the outermost decorated call is profiled
+_active = threading.local()
+
+class Sampler:
+    def __init__(self, thread_id, app_file, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.app_file = app_file
+        self.interval = interval
+        self.stacks = Counter()
+        self.attribution = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rerun-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            stack.reverse()
+
+            self.samples += 1
+            self.stacks[";".join(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})" for frame in stack)] += 1
+            self.attribution[self.attribute(stack)] += 1
+
+    def attribute(self, stack):
+        # The innermost line of the app that is on the stack, and what that line was busy with
+        app_index = None
+        for index, frame in enumerate(stack):
+            if frame.f_code.co_filename == self.app_file:
+                app_index = index
+
+        if app_index is None:
+            return "outside app"
+
+        line = f"app.py:{stack[app_index].f_lineno}"
+
+        if app_index + 1 == len(stack):
+            return f"app {line}"
+
+        callee = stack[app_index + 1].f_code
+        filename = callee.co_filename
+
+        if filename.startswith(API_DIR):
+            return f"api {callee.co_name} ({line})"
+        # Charts and their panel frames are built in functions/charts.py, ahead of altair and pandas
+        if filename == CHARTS_FILE:
+            return f"chart ({line})"
+        if filename.startswith(FUNCTIONS_DIR):
+            return f"functions {callee.co_name} ({line})"
+        if f"{os.sep}altair{os.sep}" in filename:
+            return f"chart ({line})"
+        if f"{os.sep}pandas{os.sep}" in filename:
+            return f"dataframe ({line})"
+        if f"{os.sep}streamlit{os.sep}" in filename:
+            return f"streamlit ({line})"
+
+        return f"app {line}"
+
+def write_profile(name, profiler, sampler, seconds):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{name}")
+
+    profiler.dump_stats(f"{base}.prof")
+
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as file:
+        for stack, samples in sampler.stacks.most_common():
+            file.write(f"{stack} {samples}\n")
+
+    # Samples converted to seconds of the rerun, largest first
+    share = seconds / sampler.samples if sampler.samples else 0
+    summary = {
+        "name": name,
+        "seconds": seconds,
+        "samples": sampler.samples,
+        "attribution": {label: samples * share for label, samples in sampler.attribution.most_common()}
+    }
+
+    with open(f"{base}.json", "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=2)
+
+    print(f"Profiled {name} rerun ({seconds:.2f} seconds): {base}.prof")
+
+def profile_rerun(name, requested=None):
+    # requested() lets the app switch profiling on per session, e.g. from a query parameter
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if getattr(_active, "on", False) or not (ENABLED or (requested is not None and requested())):
+                return function(*args, **kwargs)
+
+            _active.on = True
+            profiler = cProfile.Profile()
+            sampler = Sampler(threading.get_ident(), function.__code__.co_filename)
+
+            start_time = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                _active.on = False
+                write_profile(name, profiler, sampler, time.perf_counter() - start_time)
+
+        return wrapper
+
+    return decorator
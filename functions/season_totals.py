@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Per-driver prefix sums over the rounds of a season, available on every results frame as
+# frame.cumulative. For every stat, row i is one driver and column k their total after the
+# first k rounds of the season, so the state of the championship after any round is one column
+# read per driver. Like frame.by_driver it is built once per season frame and cached on it.
+
+def flag(values):
+    return values.to_numpy(dtype="float64", na_value=0)
+
+# stat: (per row value of a results frame, dtype of the totals)
+STATS = {
+    "points": (lambda results: flag(results["points"]) + flag(results["sprint_points"]), "float32"),
+    "races": (lambda results: np.ones(len(results)), "int16"),
+    "wins": (lambda results: flag(results["position"] == 1), "int16"),
+    "podiums": (lambda results: flag(results["position"] <= 3), "int16"),
+    "top10_finishes": (lambda results: flag(results["position"] <= 10), "int16"),
+    "fastest_laps": (lambda results: flag(results["fastest_lap_rank"] == 1), "int16"),
+    "sprint_wins": (lambda results: flag(results["sprint_position"] == 1), "int16"),
+    "sprint_podiums": (lambda results: flag(results["sprint_position"] <= 3), "int16"),
+    "sprint_top8_finishes": (lambda results: flag(results["sprint_position"] <= 8), "int16")
+}
+
+@pd.api.extensions.register_dataframe_accessor("cumulative")
+class CumulativeStats:
+    def __init__(self, frame):
+        self.rounds = np.unique(frame["round"].to_numpy())
+        self.drivers = np.unique(frame["driver_id"].to_numpy())
+
+        rows = np.searchsorted(self.drivers, frame["driver_id"].to_numpy())
+        columns = np.searchsorted(self.rounds, frame["round"].to_numpy()) + 1
+
+        # stats x drivers x (rounds + 1), column 0 is the start of the season
+        self.prefix = np.zeros((len(STATS), len(self.drivers), len(self.rounds) + 1))
+
+        for index, (value, _) in enumerate(STATS.values()):
+            np.add.at(self.prefix[index], (rows, columns), value(frame))
+
+        np.cumsum(self.prefix, axis=2, out=self.prefix)
+
+    def rounds_until(self, round_number):
+        # Rounds of the season run up to and including round_number
+        return int(np.searchsorted(self.rounds, round_number, side="right"))
+
+    def after(self, round_number, drivers=None):
+        # Totals of the given drivers (all of them by default) after round_number, one row per driver.
+        # Drivers without a result this season get zeros
+        driver_ids = self.drivers if drivers is None else np.asarray(drivers, dtype=self.drivers.dtype)
+
+        rows = np.searchsorted(self.drivers, driver_ids)
+        known = rows < len(self.drivers)
+        known[known] = self.drivers[rows[known]] == driver_ids[known]
+
+        totals = np.zeros((len(STATS), len(driver_ids)))
+        totals[:, known] = self.prefix[:, rows[known], self.rounds_until(round_number)]
+
+        return pd.DataFrame({
+            "driver_id": driver_ids,
+            **{stat: totals[index].astype(dtype) for index, (stat, (_, dtype)) in enumerate(STATS.items())}
+        })
+
+    def standings(self, round_number):
+        # Championship after round_number among the drivers who had started by then,
+        # ranked by points and then wins
+        totals = self.after(round_number)
+        totals = totals[totals["races"] > 0]
+
+        order = np.lexsort((-totals["wins"].to_numpy(), -totals["points"].to_numpy()))
+        totals = totals.iloc[order].reset_index(drop=True)
+        totals.insert(1, "position", np.arange(1, len(totals) + 1, dtype=np.int16))
+
+        return totals
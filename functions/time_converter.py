@@ -1,24 +1,82 @@
-def time_to_seconds(time_str):
-    try:
-        if time_str == "" or time_str is None:
-            return float('inf')  # Set to infinity to ensure invalid times are ignored in comparisons
-
-        # Split the time by the first ':'
-        minutes, sec_ms = time_str.split(":")
-
-        # Split the seconds.milliseconds part by '.'
-        seconds, milliseconds = sec_ms.split(".")
-
-        # Convert to milliseconds
-        minutes = int(minutes) * 60000  # Convert minutes to milliseconds
-        seconds = int(seconds) * 1000  # Convert seconds to milliseconds
-        milliseconds = int(milliseconds)  # Already in milliseconds
-
-        # Convert total time in milliseconds to seconds and return rounded to 3 decimals
-        total_seconds = float(minutes + seconds + milliseconds) / 1000
-        return round(total_seconds, 3)  # Rounded to 3 decimal places
-        
-    except Exception as e:
-        # If there's an error in parsing, return infinity as a fallback
-        print(f"Error parsing time {time_str}: {e}")
-        return float('inf')
\ No newline at end of file
+import numpy as np
+
+# Stored in place of a missing or unparsable time, always paired with a False in the valid mask
+MISSING_MS = np.iinfo(np.int32).min
+
+# Longest time string accepted, race totals like "1:31:44.742" are 11 characters
+MAX_LENGTH = 16
+
+ZERO, NINE, COLON, DOT, PLUS = ord("0"), ord("9"), ord(":"), ord("."), ord("+")
+
+def parse_lap_times(values):
+    # Parses a whole array or Series of Ergast time strings in one vectorized pass:
+    # "1:27.097", "58.432", "+1.234", "+1:02.345" and race totals like "1:31:44.742".
+    # Returns (int32 milliseconds, valid mask, number of non-empty values that failed to parse).
+    strings = [value if isinstance(value, str) else "" for value in np.asarray(values, dtype=object)]
+    count = len(strings)
+
+    lengths = np.fromiter(map(len, strings), dtype=np.int32, count=count)
+
+    # Only as many character positions as the longest string needs
+    width = max(1, min(int(lengths.max(initial=0)), MAX_LENGTH))
+
+    # One row of code points per character position, zero padded past the end of each string
+    chars = np.array(strings, dtype=f"U{width}").view(np.uint32).reshape(count, width).T.astype(np.int64)
+
+    valid = (lengths > 0) & (lengths <= MAX_LENGTH)
+
+    # Walk the columns instead of the rows, every step is one array operation over all strings
+    whole = np.zeros(count, dtype=np.int64)
+    field = np.zeros(count, dtype=np.int64)
+    field_digits = np.zeros(count, dtype=np.int64)
+    fraction = np.zeros(count, dtype=np.int64)
+    fraction_digits = np.zeros(count, dtype=np.int64)
+    colons = np.zeros(count, dtype=np.int64)
+    after_dot = np.zeros(count, dtype=bool)
+
+    for column in range(width):
+        char = chars[column]
+
+        digit = (char >= ZERO) & (char <= NINE)
+        colon = char == COLON
+        dot = char == DOT
+        sign = (char == PLUS) & (column == 0)
+
+        # A separator needs digits in front of it and nothing may follow the fraction but digits
+        valid &= ~((colon | dot) & (after_dot | (field_digits == 0)))
+        valid &= ~((char != 0) & ~digit & ~colon & ~dot & ~sign)
+
+        in_field = digit & ~after_dot
+        field = np.where(in_field, field * 10 + char - ZERO, field)
+        field_digits += in_field
+
+        in_fraction = digit & after_dot
+        fraction = np.where(in_fraction, fraction * 10 + char - ZERO, fraction)
+        fraction_digits += in_fraction
+
+        # Hours and minutes roll over into the next field in base 60, minutes after hours stay below 60
+        valid &= ~(colon & (colons > 0) & (field >= 60))
+        whole = np.where(colon, (whole + field) * 60, whole)
+        field = np.where(colon, 0, field)
+        field_digits = np.where(colon, 0, field_digits)
+        colons += colon
+
+        after_dot |= dot
+
+    # A dot needs digits after it, seconds after a colon stay below 60
+    valid &= (field_digits > 0) | (fraction_digits > 0)
+    valid &= ~after_dot | (fraction_digits > 0)
+    valid &= (colons == 0) | (field < 60)
+    valid &= (colons <= 2) & (fraction_digits <= 3)
+
+    # "58.4" means 400 ms, so the fraction is scaled up to three digits
+    millis = fraction * 10 ** (3 - np.minimum(fraction_digits, 3))
+    total = (whole + field) * 1000 + millis
+    valid &= total <= np.iinfo(np.int32).max
+
+    milliseconds = np.full(count, MISSING_MS, dtype=np.int32)
+    milliseconds[valid] = total[valid]
+
+    errors = int(np.count_nonzero((lengths > 0) & ~valid))
+
+    return milliseconds, valid, errors
@@ -0,0 +1,60 @@
+import pytest
+import api.client
+import api.pagination
+import api.store
+from api.client import background
+from api.pagination import fetch_all_pages
+from api.results_api import fetch_results
+from api.store import use_store
+from tools.ergast_server import synthesize_season, flatten, regroup
+
+# Requests made on the executor threads of a paged fetch keep the priority of the caller
+
+LIST_KEYS = {"results": 'Results', "sprint": 'SprintResults'}
+
+@pytest.fixture
+def sent(monkeypatch):
+    # (endpoint, offset, background flag) of every request, served from a synthesized season
+    season = synthesize_season(2023, 8, sprint_every=4)
+    made = []
+
+    def get_json(url, params=None):
+        endpoint = url.rstrip("/").rsplit("/", 1)[-1]
+        rows = flatten(season[endpoint], LIST_KEYS[endpoint])
+        offset, limit = params["offset"], min(params["limit"], 30)
+
+        made.append((endpoint, offset, api.client._background.get()))
+
+        return {"MRData": {
+            "total": str(len(rows)),
+            "limit": str(limit),
+            'RaceTable': {'Races': regroup(rows[offset:offset + limit], LIST_KEYS[endpoint])}
+        }}
+
+    monkeypatch.setattr(api.pagination, "get_json", get_json)
+    return made
+
+@pytest.mark.parametrize("in_background", [True, False])
+def test_paged_fetch_keeps_the_priority(sent, in_background):
+    url = f"{api.client.BASE_URL}/2023/results/"
+
+    if in_background:
+        with background():
+            fetch_all_pages(url, 'RaceTable', 'Races', 'Results')
+    else:
+        fetch_all_pages(url, 'RaceTable', 'Races', 'Results')
+
+    assert len(sent) > 1
+    assert [flag for _, _, flag in sent] == [in_background] * len(sent)
+
+def test_results_and_sprint_keep_the_priority(sent, tmp_path):
+    store_path = api.store.STORE_PATH
+    use_store(str(tmp_path / "store.sqlite3"))
+    try:
+        with background():
+            fetch_results(2023)
+    finally:
+        use_store(store_path)
+
+    assert {endpoint for endpoint, _, _ in sent} == {"results", "sprint"}
+    assert all(flag for _, _, flag in sent)
@@ -0,0 +1,60 @@
+import copy
+import pandas as pd
+import pytest
+from api.results_api import build_results_frame, extend_results_frame
+from api.qualifying_api import build_qualifying_frame, extend_qualifying_frame
+from tools.ergast_server import synthesize_season
+
+# A season as the API had it after round 5 was half published (sprint included), extended
+# with the full season must come out as a full rebuild of it
+
+ROUNDS = 8
+LAST_ROUND = 5
+
+@pytest.fixture(scope="module")
+def season():
+    return synthesize_season(2023, ROUNDS, sprint_every=LAST_ROUND)
+
+def partial(races, list_key):
+    # Rounds up to LAST_ROUND, the last one with only the first half of its rows
+    races = copy.deepcopy([race for race in races if int(race['round']) <= LAST_ROUND])
+
+    for race in races:
+        if int(race['round']) == LAST_ROUND:
+            race[list_key] = race[list_key][:len(race[list_key]) // 2]
+
+    return races
+
+def test_extend_results_frame_matches_full_rebuild(season):
+    previous = build_results_frame(partial(season["results"], 'Results'), partial(season["sprint"], 'SprintResults'))
+
+    extended = extend_results_frame(previous, season["results"], season["sprint"])
+    full = build_results_frame(season["results"], season["sprint"])
+
+    pd.testing.assert_frame_equal(extended, full, check_categorical=False)
+
+def test_extend_results_frame_carries_totals_of_drivers_missing_rounds(season):
+    previous = build_results_frame(partial(season["results"], 'Results'), partial(season["sprint"], 'SprintResults'))
+
+    extended = extend_results_frame(previous, season["results"], season["sprint"])
+
+    # The reserve driver only races round ROUNDS // 2, their totals stay put afterwards
+    reserve = extended[extended["given_name"] == "Driver21"]
+    assert reserve["round"].tolist() == [ROUNDS // 2]
+
+    last_rows = extended.groupby("driver_id")["total_points"].last()
+    points = (extended["points"] + extended["sprint_points"].fillna(0)).groupby(extended["driver_id"]).sum()
+    pd.testing.assert_series_equal(last_rows, points.astype("float32"), check_names=False)
+
+def test_extend_qualifying_frame_matches_full_rebuild(season):
+    previous = build_qualifying_frame(partial(season["qualifying"], 'QualifyingResults'))
+
+    extended = extend_qualifying_frame(previous, season["qualifying"])
+    full = build_qualifying_frame(season["qualifying"])
+
+    pd.testing.assert_frame_equal(extended, full, check_categorical=False)
+
+def test_extend_of_an_empty_season_is_a_full_build(season):
+    extended = extend_qualifying_frame(build_qualifying_frame([]), season["qualifying"])
+
+    pd.testing.assert_frame_equal(extended, build_qualifying_frame(season["qualifying"]), check_categorical=False)
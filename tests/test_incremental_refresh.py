@@ -0,0 +1,120 @@
+import copy
+import datetime
+import pytest
+import api.pagination
+import api.pitstops_api
+import api.store
+from api.pagination import fetch_rows_after
+from api.incremental import update_season
+from api.store import use_store, save_season, load_season
+from tools.ergast_server import synthesize_season, flatten, regroup
+
+# A stored season refreshed against a server whose copy has moved on since: new rounds, and
+# rows of rounds already stored that changed, appeared or went away
+
+ROUNDS = 8
+LAST_ROUND = 5
+URL = "http://ergast.test/ergast/f1/2023/results/"
+
+@pytest.fixture
+def season():
+    return synthesize_season(2023, ROUNDS, sprint_every=4)["results"]
+
+@pytest.fixture
+def server(monkeypatch):
+    # server["races"] is what the API serves, pages of at most 30 rows like jolpica's default
+    state = {"races": [], "offsets": []}
+
+    def fetch_page(url, offset, limit=30):
+        rows = flatten(state["races"], 'Results')
+        limit = min(limit, 30)
+        state["offsets"].append(offset)
+
+        return {
+            "total": str(len(rows)),
+            "limit": str(limit),
+            "offset": str(offset),
+            'RaceTable': {'Races': copy.deepcopy(regroup(rows[offset:offset + limit], 'Results'))}
+        }
+
+    monkeypatch.setattr(api.pagination, "fetch_page", fetch_page)
+    return state
+
+def stored_part(races):
+    return copy.deepcopy([race for race in races if int(race['round']) <= LAST_ROUND])
+
+def test_points_of_the_last_stored_round_changed(season, server):
+    stored = stored_part(season)
+
+    # A penalty after the season was stored, and the rounds run since
+    penalized = season[LAST_ROUND - 1]['Results'][0]
+    penalized['points'] = str(float(penalized['points']) - 5)
+    server["races"] = season
+
+    assert fetch_rows_after(URL, stored, 'RaceTable', 'Races', 'Results') == season
+
+def test_nothing_new_is_one_request(season, server):
+    server["races"] = season
+
+    assert fetch_rows_after(URL, copy.deepcopy(season), 'RaceTable', 'Races', 'Results') == season
+    assert len(server["offsets"]) == 1
+
+@pytest.mark.parametrize("change", ["inserted", "dropped"])
+def test_rows_of_an_earlier_round_moved(season, server, change):
+    stored = stored_part(season)
+
+    # Every offset after round 2 moves by one row, the refresh must not stitch rows onto the wrong round
+    if change == "inserted":
+        season[1]['Results'].append(copy.deepcopy(season[1]['Results'][-1]))
+    else:
+        season[1]['Results'].pop(3)
+    server["races"] = season
+
+    refreshed = fetch_rows_after(URL, stored, 'RaceTable', 'Races', 'Results')
+
+    assert refreshed == season
+    assert server["offsets"][0] != 0 and 0 in server["offsets"]
+
+def test_finished_season_stored_while_running_is_fetched_whole(season, server, monkeypatch, tmp_path):
+    store_path = api.store.STORE_PATH
+    use_store(str(tmp_path / "store.sqlite3"))
+    try:
+        # Stored mid season, round 2 was reclassified after that
+        with monkeypatch.context() as patch:
+            patch.setattr(api.store.time, "time", lambda: datetime.datetime(2023, 7, 1).timestamp())
+            save_season("results", 2023, stored_part(season))
+
+        season[1]['Results'][0]['points'] = "0"
+        server["races"] = season
+
+        assert update_season("results", 2023) == season
+        assert load_season("results", 2023) == season
+    finally:
+        use_store(store_path)
+
+def test_pitstops_refetch_every_round_stored_without_stops(monkeypatch, tmp_path):
+    season = synthesize_season(2024, ROUNDS, sprint_every=4)
+    fetched = []
+
+    def fetch_round(year, round_number):
+        fetched.append(round_number)
+        return copy.deepcopy([race for race in season["pitstops"] if int(race['round']) == round_number])
+
+    monkeypatch.setattr(api.pitstops_api, "update_season", lambda endpoint, year: season["results"])
+    monkeypatch.setattr(api.pitstops_api, "fetch_round", fetch_round)
+
+    store_path = api.store.STORE_PATH
+    use_store(str(tmp_path / "store.sqlite3"))
+    try:
+        # Stored after a double header whose rounds 4 and 5 had no stops published yet
+        stored = api.pitstops_api.season_columns([race for race in season["pitstops"] if int(race['round']) <= 3])
+        with monkeypatch.context() as patch:
+            patch.setattr(api.store.time, "time", lambda: 0)
+            save_season("pitstops", 2024, {"rounds": list(range(1, 6)), **stored})
+
+        payload = api.pitstops_api.update_pitstops(2024)
+    finally:
+        use_store(store_path)
+
+    assert sorted(fetched) == [3, 4, 5, 6, 7, 8]
+    assert {key: value for key, value in payload.items() if key != "rounds"} == api.pitstops_api.season_columns(season["pitstops"])
@@ -0,0 +1,26 @@
+import pytest
+from api.cache import SeasonCache
+from api.client import FetchError
+
+def test_cached_failure_is_a_new_exception_per_caller():
+    cache = SeasonCache(lambda key, stored_at: True, "test_failures")
+
+    def load(key):
+        raise FetchError(f"season {key} is unavailable")
+
+    raised = []
+    for _ in range(4):
+        with pytest.raises(FetchError, match="season 2023 is unavailable") as info:
+            cache.get(2023, load)
+        raised.append(info.value)
+
+    assert len({id(error) for error in raised}) == 4
+    assert cache.get_stats()["failures"] == 1 and cache.get_stats()["failure_hits"] == 3
+
+    # A served failure only carries the frames of its own call
+    depth = 0
+    traceback = raised[-1].__traceback__
+    while traceback is not None:
+        depth += 1
+        traceback = traceback.tb_next
+    assert depth <= 3
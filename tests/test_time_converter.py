@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from functions.time_converter import parse_lap_times, MISSING_MS
+
+@pytest.mark.parametrize("value, milliseconds", [
+    ("1:27.097", 87097),
+    ("0:59.999", 59999),
+    ("58.432", 58432),
+    ("58.4", 58400),
+    ("58", 58000),
+    ("+1.234", 1234),
+    ("+1:02.345", 62345),
+    ("1:31:44.742", 5504742)
+])
+def test_accepted_forms(value, milliseconds):
+    parsed, valid, errors = parse_lap_times([value])
+
+    assert valid.tolist() == [True]
+    assert parsed.tolist() == [milliseconds]
+    assert errors == 0
+
+@pytest.mark.parametrize("value", [
+    "1.",
+    ".5",
+    "+",
+    "abc",
+    "1:27.0971",
+    "1:2:3:4.5",
+    "1:27.09.7",
+    "1.2:03",
+    "-1.234",
+    "1:27.097 "
+])
+def test_rejected_forms(value):
+    parsed, valid, errors = parse_lap_times([value])
+
+    assert valid.tolist() == [False]
+    assert parsed.tolist() == [MISSING_MS]
+    assert errors == 1
+
+@pytest.mark.parametrize("value", ["1:60.000", "99:99.999", "1:60:00.000", "1:59:60"])
+def test_rejects_fields_of_60_and_more(value):
+    _, valid, errors = parse_lap_times([value])
+
+    assert valid.tolist() == [False]
+    assert errors == 1
+
+def test_missing_values_are_not_errors():
+    parsed, valid, errors = parse_lap_times([None, "", np.nan, "1:27.097", "bad"])
+
+    assert valid.tolist() == [False, False, False, True, False]
+    assert parsed[~valid].tolist() == [MISSING_MS] * 4
+    assert errors == 1
+
+def test_empty_input():
+    parsed, valid, errors = parse_lap_times([])
+
+    assert len(parsed) == 0 and len(valid) == 0
+    assert errors == 0
+
+def test_mixed_lengths_in_one_pass():
+    values = ["58.432", "1:31:44.742", "+1.234", "1:27.097"]
+
+    parsed, valid, _ = parse_lap_times(values)
+
+    assert valid.all()
+    assert parsed.tolist() == [58432, 5504742, 1234, 87097]
@@ -0,0 +1,77 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Repeatable latency benchmark of the api layer, normally run against tools/ergast_server.py:
+#
+#   python -m tools.ergast_server serve --latency 0.05 &
+#   python -m tools.benchmark --base-url http://127.0.0.1:8765/ergast/f1 --seasons 2023 --repeat 5
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the api fetch functions")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8765/ergast/f1")
+    parser.add_argument("--seasons", default="2023", help="e.g. 2023 or 2020-2024")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the jolpica rate limits, off by default for local runs")
+    args = parser.parse_args()
+
+    # The api modules read their configuration at import time
+    os.environ["F1_API_BASE_URL"] = args.base_url
+    if not args.rate_limit:
+        os.environ["F1_API_BURST_RATE"] = "1000000"
+        os.environ["F1_API_HOURLY_LIMIT"] = "1000000000"
+
+    from api import drivers_api, qualifying_api, results_api, standings_api
+    from api.client import get_stats
+    from api.season_loader import load_season_data
+    from api.store import use_store
+    from api.__main__ import parse_seasons
+
+    functions = {
+        "get_drivers_data": (drivers_api.cache, drivers_api.get_drivers_data),
+        "get_standings_data": (standings_api.cache, standings_api.get_standings_data),
+        "get_results_data": (results_api.cache, results_api.get_results_data),
+        "get_qualifying_data": (qualifying_api.cache, qualifying_api.get_qualifying_data)
+    }
+
+    seasons = parse_seasons(args.seasons)
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(args.repeat):
+            for year in seasons:
+                # cold: empty store, everything over HTTP
+                # store: process restart, in-memory caches empty but the season store is warm
+                for scenario in ("cold", "store"):
+                    if scenario == "cold":
+                        use_store(os.path.join(directory, f"run_{run}_{year}.sqlite3"))
+
+                    for name, (cache, function) in functions.items():
+                        cache.clear()
+                        start_time = time.perf_counter()
+                        function(year)
+                        timings.setdefault((scenario, name), []).append(time.perf_counter() - start_time)
+
+                use_store(os.path.join(directory, f"run_{run}_{year}_loader.sqlite3"))
+                start_time = time.perf_counter()
+                load_season_data(year)
+                timings.setdefault(("cold", "load_season_data"), []).append(time.perf_counter() - start_time)
+
+    print(f"{'scenario':<8} {'function':<22} {'min ms':>9} {'median ms':>10} {'p95 ms':>9}")
+    for (scenario, name), samples in timings.items():
+        samples = [sample * 1000 for sample in samples]
+        print(f"{scenario:<8} {name:<22} {min(samples):>9.1f} {statistics.median(samples):>10.1f} {percentile(samples, 0.95):>9.1f}")
+
+    print(f"client: {get_stats()}")
+    for name, (cache, _) in functions.items():
+        print(f"{name} cache: {cache.get_stats()}")
+
+if __name__ == "__main__":
+    main()
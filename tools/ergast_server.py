@@ -0,0 +1,395 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from api.__main__ import parse_seasons
+from api.season_loader import ENDPOINTS as SEASON_ENDPOINTS
+
+# Local stand-in for the jolpica Ergast API. It replays fixture files recorded from the
+# live API (or synthesized), honours limit/offset and can inject latency and errors,
+# so the api modules can be benchmarked on a box without network access.
+#
+#   python -m tools.ergast_server record --seasons 2023-2024
+#   python -m tools.ergast_server serve --port 8765 --latency 0.05 --error-rate 0.02
+#   F1_API_BASE_URL=http://127.0.0.1:8765/ergast/f1 streamlit run app.py
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Same defaults as jolpica
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 100
+
+# endpoint: (table key, items key, per race list key), the season endpoints the app loads and the per round ones
+ENDPOINTS = {
+    **SEASON_ENDPOINTS,
+    "laps": ('RaceTable', 'Races', 'Laps'),
+    "pitstops": ('RaceTable', 'Races', 'PitStops')
+}
+
+# Endpoints Ergast only serves per round
+ROUND_ONLY = ("laps", "pitstops")
+
+# Endpoints that count the rows of a nested list, a lap is paged by its timings
+NESTED_KEYS = {"laps": 'Timings'}
+
+URL_PATTERN = re.compile(r"^/ergast/f1/(\d{4})(?:/(\d+))?/(\w+?)(?:\.json)?/?$")
+
+######### FIXTURES #########
+
+def fixture_path(fixtures_dir, year, endpoint):
+    return os.path.join(fixtures_dir, str(year), f"{endpoint}.json")
+
+def write_fixture(fixtures_dir, year, endpoint, payload):
+    path = fixture_path(fixtures_dir, year, endpoint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+def flatten(payload, list_key, nested_key=None):
+    # One row per item the API counts towards MRData.total
+    if list_key is None:
+        return [(None, item) for item in payload]
+
+    rows = []
+    for parent in payload:
+        for item in parent.get(list_key, []):
+            if nested_key is None:
+                rows.append((parent, item))
+            else:
+                rows.extend((parent, (item, nested)) for nested in item.get(nested_key, []))
+    return rows
+
+def regroup(rows, list_key, nested_key=None):
+    if list_key is None:
+        return [item for _, item in rows]
+
+    grouped = []
+    for parent, item in rows:
+        if not grouped or grouped[-1][0] is not parent:
+            head = {key: value for key, value in parent.items() if key != list_key}
+            head[list_key] = []
+            grouped.append((parent, head, []))
+
+        if nested_key is None:
+            grouped[-1][1][list_key].append(item)
+            continue
+
+        # A page boundary may split a lap, each page then carries the part of it that it holds
+        item, nested = item
+        items = grouped[-1][2]
+        if not items or items[-1][0] is not item:
+            items.append((item, {key: value for key, value in item.items() if key != nested_key}))
+            items[-1][1][nested_key] = []
+            grouped[-1][1][list_key].append(items[-1][1])
+        items[-1][1][nested_key].append(nested)
+
+    return [head for _, head, _ in grouped]
+
+class FixtureSet:
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = fixtures_dir
+        self.rows = {}
+        self.lock = threading.Lock()
+
+    def get_rows(self, year, endpoint, round_number=None):
+        key = (year, endpoint)
+
+        with self.lock:
+            if key not in self.rows:
+                path = fixture_path(self.fixtures_dir, year, endpoint)
+                if not os.path.exists(path):
+                    return None
+                with open(path) as f:
+                    self.rows[key] = flatten(json.load(f), ENDPOINTS[endpoint][2], NESTED_KEYS.get(endpoint))
+            rows = self.rows[key]
+
+        if round_number is not None:
+            rows = [row for row in rows if row[0] is not None and row[0].get('round') == str(round_number)]
+
+        return rows
+
+######### SERVER #########
+
+def make_handler(fixtures, latency, jitter, error_rate, throttle_rate):
+    class ErgastHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if latency or jitter:
+                time.sleep(latency + random.uniform(0, jitter))
+
+            roll = random.random()
+            if roll < throttle_rate:
+                return self.send_json(429, {"detail": "Too many requests"}, {"Retry-After": "1"})
+            if roll < throttle_rate + error_rate:
+                return self.send_json(503, {"detail": "Injected error"})
+
+            url = urlparse(self.path)
+            match = URL_PATTERN.match(url.path)
+
+            if not match or match.group(3) not in ENDPOINTS:
+                return self.send_json(404, {"detail": "Not found"})
+
+            year, round_number, endpoint = int(match.group(1)), match.group(2), match.group(3)
+            rows = fixtures.get_rows(year, endpoint, round_number)
+
+            if rows is None:
+                return self.send_json(404, {"detail": f"No fixture for {year} {endpoint}"})
+
+            query = parse_qs(url.query)
+            limit = min(int(query.get("limit", [DEFAULT_LIMIT])[0]), MAX_LIMIT)
+            offset = int(query.get("offset", [0])[0])
+
+            table_key, items_key, list_key = ENDPOINTS[endpoint]
+
+            self.send_json(200, {
+                "MRData": {
+                    "series": "f1",
+                    "url": self.path,
+                    "limit": str(limit),
+                    "offset": str(offset),
+                    "total": str(len(rows)),
+                    table_key: {
+                        "season": str(year),
+                        items_key: regroup(rows[offset:offset + limit], list_key, NESTED_KEYS.get(endpoint))
+                    }
+                }
+            })
+
+    return ErgastHandler
+
+def serve(args):
+    fixtures = FixtureSet(args.fixtures)
+    handler = make_handler(fixtures, args.latency, args.jitter, args.error_rate, args.throttle_rate)
+
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Serving {args.fixtures} on http://{args.host}:{args.port}/ergast/f1")
+    server.serve_forever()
+
+######### RECORD #########
+
+def record(args):
+    from api.client import BASE_URL
+    from api.pagination import fetch_all_pages
+
+    for year in parse_seasons(args.seasons):
+        for endpoint, (table_key, items_key, list_key) in ENDPOINTS.items():
+            if endpoint in ROUND_ONLY:
+                continue
+
+            payload = fetch_all_pages(f"{BASE_URL}/{year}/{endpoint}/", table_key, items_key, list_key)
+            write_fixture(args.fixtures, year, endpoint, payload)
+            print(f"Recorded {year} {endpoint}")
+
+        # Per round endpoints, the rounds come from the results just recorded
+        with open(fixture_path(args.fixtures, year, "results")) as f:
+            rounds = [race['round'] for race in json.load(f)]
+
+        for endpoint in (endpoint for endpoint in ROUND_ONLY if getattr(args, endpoint)):
+            table_key, items_key, list_key = ENDPOINTS[endpoint]
+
+            payload = []
+            for round_number in rounds:
+                payload.extend(fetch_all_pages(f"{BASE_URL}/{year}/{round_number}/{endpoint}/", table_key, items_key, list_key))
+            write_fixture(args.fixtures, year, endpoint, payload)
+            print(f"Recorded {year} {endpoint}")
+
+######### SYNTHESIZE #########
+
+TEAMS = ["Red Bull", "Ferrari", "Mercedes", "McLaren", "Alpine", "Williams", "Haas F1 Team", "Sauber", "Aston Martin", "RB F1 Team"]
+RACE_POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+SPRINT_POINTS = [8, 7, 6, 5, 4, 3, 2, 1]
+
+def lap_time(milliseconds):
+    minutes, rest = divmod(milliseconds, 60000)
+    seconds, millis = divmod(rest, 1000)
+    return f"{minutes}:{seconds:02d}.{millis:03d}"
+
+def synthesize_season(year, rounds, sprint_every):
+    # Deterministic, Ergast shaped data for offline benchmarks when no recording is at hand
+    rng = random.Random(year)
+
+    drivers = []
+    for number in range(1, 22):
+        driver = {
+            "driverId": f"driver_{number}",
+            "permanentNumber": str(number),
+            "code": f"D{number:02d}",
+            "givenName": f"Driver{number}",
+            "familyName": f"Number{number}"
+        }
+        drivers.append((driver, TEAMS[min((number - 1) // 2, len(TEAMS) - 1)]))
+
+    races, sprints, qualifyings, laps, pitstops = [], [], [], [], []
+    points = {}
+
+    for round_number in range(1, rounds + 1):
+        # The reserve driver stands in for one race mid season
+        field = drivers[:20] if round_number != rounds // 2 else drivers[:19] + drivers[20:]
+
+        race = {
+            "season": str(year),
+            "round": str(round_number),
+            "raceName": f"Grand Prix {round_number}",
+            "Circuit": {"circuitId": f"circuit_{round_number}", "circuitName": f"Circuit {round_number}"},
+            "date": f"{year}-{3 + round_number // 3:02d}-{1 + round_number % 28:02d}"
+        }
+        base_time = 75000 + rng.randint(0, 20000)
+
+        finish = rng.sample(field, len(field))
+        results = []
+        for position, (driver, team) in enumerate(finish, 1):
+            race_points = RACE_POINTS[position - 1] if position <= 10 else 0
+            points[driver["driverId"]] = points.get(driver["driverId"], (0, 0, driver, team))
+            total, wins, _, _ = points[driver["driverId"]]
+            points[driver["driverId"]] = (total + race_points, wins + (position == 1), driver, team)
+
+            results.append({
+                "number": driver["permanentNumber"],
+                "position": str(position),
+                "positionText": str(position),
+                "points": str(race_points),
+                "Driver": driver,
+                "Constructor": {"constructorId": team.lower().replace(" ", "_"), "name": team},
+                "grid": str(rng.randint(1, 20)),
+                "status": "Finished" if position <= 17 else "Retired",
+                "FastestLap": {"rank": str(rng.randint(1, len(field))), "Time": {"time": lap_time(base_time + rng.randint(0, 2000))}}
+            })
+        races.append(dict(race, Results=results))
+
+        # Lap timings in the finishing order, the retired cars stop early. Own generator, so the
+        # other endpoints come out the same as before laps were synthesized
+        lap_rng = random.Random(year * 100 + round_number)
+        race_laps = 50 + round_number % 20
+        last_laps = {driver["driverId"]: race_laps if position <= 17 else lap_rng.randint(1, race_laps - 1) for position, (driver, _) in enumerate(finish, 1)}
+        laps.append(dict(race, Laps=[{
+            "number": str(number),
+            "Timings": [{
+                "driverId": driver["driverId"],
+                "position": str(position),
+                "time": lap_time(base_time + 1500 + lap_rng.randint(0, 1500))
+            } for position, (driver, _) in enumerate((entry for entry in finish if last_laps[entry[0]["driverId"]] >= number), 1)]
+        } for number in range(1, race_laps + 1)]))
+
+        # One or two stops per finisher, from the same generator as the laps
+        pitstops.append(dict(race, PitStops=sorted(({
+            "driverId": driver["driverId"],
+            "lap": str(lap),
+            "stop": str(stop),
+            "time": f"{14 + lap // 30}:{lap % 60:02d}:00",
+            "duration": f"{lap_rng.uniform(20.5, 26):.3f}"
+        } for driver, _ in finish if last_laps[driver["driverId"]] == race_laps
+            for stop, lap in enumerate(sorted(lap_rng.sample(range(8, race_laps - 5), lap_rng.randint(1, 2))), 1)
+        ), key=lambda pit_stop: int(pit_stop["lap"]))))
+
+        grid = rng.sample(field, len(field))
+        qualifying_results = []
+        for position, (driver, team) in enumerate(grid, 1):
+            result = {
+                "number": driver["permanentNumber"],
+                "position": str(position),
+                "Driver": driver,
+                "Constructor": {"constructorId": team.lower().replace(" ", "_"), "name": team},
+                "Q1": lap_time(base_time + 600 + position * 40)
+            }
+            if position <= 15:
+                result["Q2"] = lap_time(base_time + 300 + position * 35)
+            if position <= 10:
+                result["Q3"] = lap_time(base_time + position * 30)
+            qualifying_results.append(result)
+        qualifyings.append(dict(race, QualifyingResults=qualifying_results))
+
+        if sprint_every and round_number % sprint_every == 0:
+            sprint_order = rng.sample(field, len(field))
+            sprint_results = [{
+                "number": driver["permanentNumber"],
+                "position": str(position),
+                "positionText": str(position),
+                "points": str(SPRINT_POINTS[position - 1] if position <= 8 else 0),
+                "Driver": driver,
+                "Constructor": {"constructorId": team.lower().replace(" ", "_"), "name": team},
+                "status": "Finished"
+            } for position, (driver, team) in enumerate(sprint_order, 1)]
+            sprints.append(dict(race, SprintResults=sprint_results))
+
+    ranked = sorted(points.values(), key=lambda entry: -entry[0])
+    standings = [{
+        "season": str(year),
+        "round": str(rounds),
+        "DriverStandings": [{
+            "position": str(position),
+            "points": str(total),
+            "wins": str(wins),
+            "Driver": driver,
+            "Constructors": [{"constructorId": team.lower().replace(" ", "_"), "name": team}]
+        } for position, (total, wins, driver, team) in enumerate(ranked, 1)]
+    }]
+
+    return {
+        "drivers": [driver for driver, _ in drivers],
+        "driverstandings": standings,
+        "results": races,
+        "sprint": sprints,
+        "qualifying": qualifyings,
+        "laps": laps,
+        "pitstops": pitstops
+    }
+
+def synthesize(args):
+    for year in parse_seasons(args.seasons):
+        for endpoint, payload in synthesize_season(year, args.rounds, args.sprint_every).items():
+            write_fixture(args.fixtures, year, endpoint, payload)
+        print(f"Synthesized {year}")
+
+######### CLI #########
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Ergast stand-in server")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="fixture directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="replay fixtures over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve_parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, uniform")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    serve_parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    serve_parser.set_defaults(func=serve)
+
+    record_parser = commands.add_parser("record", help="record fixtures from F1_API_BASE_URL")
+    record_parser.add_argument("--seasons", required=True, help="e.g. 2023 or 2020-2024")
+    record_parser.add_argument("--laps", action="store_true", help="also record lap timings, one request per 100 timings")
+    record_parser.add_argument("--pitstops", action="store_true", help="also record pit stops, one request per round")
+    record_parser.set_defaults(func=record)
+
+    synthesize_parser = commands.add_parser("synthesize", help="write deterministic synthetic fixtures")
+    synthesize_parser.add_argument("--seasons", required=True, help="e.g. 2023 or 2020-2024")
+    synthesize_parser.add_argument("--rounds", type=int, default=24)
+    synthesize_parser.add_argument("--sprint-every", type=int, default=4)
+    synthesize_parser.set_defaults(func=synthesize)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()